@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for EPUB Reader's loading pipeline
+
+Generates synthetic EPUBs (see synthetic_epub.py), times each stage of
+opening a book and records peak memory, then writes the results as JSON.
+
+Examples:
+    python benchmark.py -o before.json
+    python benchmark.py --scenario cjk-large --repeat 5 -o after.json
+    python benchmark.py --compare before.json after.json
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import argparse
+import statistics
+import subprocess
+import tracemalloc
+
+import epub_engine
+from epub_engine import BACKENDS, EpubSource, clean_text, document_text, extract_texts
+from pagination import FontMetrics, Paginator, PageLayout
+from synthetic_epub import make_epub
+
+RESULTS_VERSION = 1
+
+# name: synthetic_epub.make_epub arguments
+SCENARIOS = {
+    "latin-small": {"chapters": 20, "chapter_chars": 20000, "script": "latin", "images": 0},
+    "latin-large": {"chapters": 400, "chapter_chars": 50000, "script": "latin", "images": 0},
+    "cjk-large": {"chapters": 400, "chapter_chars": 20000, "script": "cjk", "images": 0},
+    "illustrated": {"chapters": 60, "chapter_chars": 10000, "script": "latin", "images": 60},
+}
+DEFAULT_SCENARIOS = ("latin-small", "latin-large", "cjk-large", "illustrated")
+
+
+class BookFixture:
+    """State shared by the stages of one scenario"""
+
+    def __init__(self, path):
+        self.path = path
+        source = EpubSource(path)
+        self.zip_paths = [source.zip_path(item['href']) for item in source.spine]
+        self.documents = [source.read(item['href']) for item in source.spine]
+        source.close()
+        self.raw_texts = [document_text(doc, "lxml") for doc in self.documents]
+        self.texts = [clean_text(text) for text in self.raw_texts]
+
+
+def stage_zip_read(book):
+    source = EpubSource(book.path)
+    for item in source.spine:
+        source.read(item['href'])
+    source.close()
+
+
+def make_extract_stage(backend):
+    def stage(book):
+        for document in book.documents:
+            document_text(document, backend)
+    return stage
+
+
+def stage_text_cleanup(book):
+    for text in book.raw_texts:
+        clean_text(text)
+
+
+def stage_parallel_extract(book):
+    extract_texts(book.path, book.zip_paths, workers=0, backend="lxml")
+
+
+def stage_paginate(book):
+    # A fixed-pitch stand-in for Tk font metrics keeps this stage headless;
+    # the page size is the reader's default 400x600 page less its margins
+    metrics = FontMetrics(lambda text: 7 * len(text), 18)
+    paginator = Paginator(metrics, 336, 536)
+    for text in book.texts:
+        paginator.paginate(text)
+
+
+def stage_first_spread(book):
+    # What opening a chapter costs: only its first two pages are laid out
+    metrics = FontMetrics(lambda text: 7 * len(text), 18)
+    paginator = Paginator(metrics, 336, 536)
+    for text in book.texts:
+        layout = PageLayout(paginator, text)
+        layout.bounds(0)
+        layout.bounds(1)
+
+
+def get_stages():
+    """Return the ordered (name, function) list of stages to time"""
+    stages = [("zip_read", stage_zip_read)]
+    for backend in BACKENDS:
+        if backend != "lxml" or epub_engine.etree is not None:
+            stages.append((f"html_extract_{backend}", make_extract_stage(backend)))
+    stages += [
+        ("text_cleanup", stage_text_cleanup),
+        ("parallel_extract", stage_parallel_extract),
+        ("paginate", stage_paginate),
+        ("first_spread", stage_first_spread),
+    ]
+    return stages
+
+
+def measure(stage, book, repeat):
+    """Time a stage repeat times, then run it once more under tracemalloc for peak memory"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stage(book)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    stage(book)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "seconds_min": min(timings),
+        "seconds_median": statistics.median(timings),
+        "peak_bytes": peak
+    }
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, where the platform reports it"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except Exception:
+        return None
+
+
+def run_scenario(name, params, repeat, work_dir):
+    path = os.path.join(work_dir, f"{name}.epub")
+    make_epub(path, seed=0, **params)
+    book = BookFixture(path)
+    print(f"📚 {name}: {len(book.documents)} documents, "
+          f"{sum(map(len, book.documents)) / 1e6:.1f} MB HTML, "
+          f"{sum(map(len, book.texts)) / 1e6:.1f} M chars", file=sys.stderr)
+
+    stages = {}
+    for stage_name, stage in get_stages():
+        stages[stage_name] = measure(stage, book, repeat)
+        result = stages[stage_name]
+        print(f"   {stage_name:<20} {result['seconds_median'] * 1000:10.1f} ms "
+              f"{result['peak_bytes'] / 1e6:10.1f} MB peak", file=sys.stderr)
+
+    return {
+        "scenario": name,
+        "params": params,
+        "file_bytes": os.path.getsize(path),
+        "documents": len(book.documents),
+        "text_chars": sum(map(len, book.texts)),
+        "stages": stages
+    }
+
+
+def run(args):
+    names = args.scenario or list(DEFAULT_SCENARIOS)
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = [run_scenario(name, SCENARIOS[name], args.repeat, work_dir) for name in names]
+
+    report = {
+        "version": RESULTS_VERSION,
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": args.repeat,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "results": results
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results written to {args.output}", file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 0
+
+
+def compare(baseline_path, current_path, threshold):
+    """Print per-stage time ratios between two result files; fail on regressions"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {r["scenario"]: r for r in json.load(f)["results"]}
+    with open(current_path, 'r', encoding='utf-8') as f:
+        current = {r["scenario"]: r for r in json.load(f)["results"]}
+
+    regressions = 0
+    for scenario, result in current.items():
+        if scenario not in baseline:
+            continue
+        print(f"📚 {scenario}")
+        for stage, stats in result["stages"].items():
+            before = baseline[scenario]["stages"].get(stage)
+            if not before or not before["seconds_median"]:
+                continue
+            ratio = stats["seconds_median"] / before["seconds_median"]
+            flag = "❌" if ratio > threshold else "✅"
+            regressions += ratio > threshold
+            print(f"   {flag} {stage:<20} {before['seconds_median'] * 1000:10.1f} ms -> "
+                  f"{stats['seconds_median'] * 1000:10.1f} ms  ({ratio:.2f}x)")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark EPUB loading stages on synthetic books.")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="scenario to run (repeatable; default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage")
+    parser.add_argument("-o", "--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="compare two result files instead of running")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="slowdown ratio reported as a regression by --compare")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return compare(args.compare[0], args.compare[1], args.threshold)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
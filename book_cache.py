@@ -0,0 +1,190 @@
+"""
+On-disk cache of parsed EPUB books for EPUB Reader
+
+Each book has a small JSON entry with its metadata, chapter list and
+navigation index, and a chapter store (see chapter_store.py) holding the extracted text.
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+
+from chapter_store import ChapterStore
+
+CACHE_VERSION = 6
+
+
+class BookCache:
+    """Stores extracted chapter lists on disk, keyed by path, size and mtime"""
+
+    def __init__(self, cache_dir="epub_reader_cache", max_bytes=200 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _key(self, file_path):
+        return hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()
+
+    def _entry_path(self, file_path):
+        """Return the cache file used for a book path"""
+        return self.sidecar_path(file_path, ".json")
+
+    def sidecar_path(self, file_path, suffix):
+        """Return a cache file for extra per-book data, evicted together with the book entry"""
+        return os.path.join(self.cache_dir, f"{self._key(file_path)}{suffix}")
+
+    def fingerprint(self, file_path):
+        """Return the (size, mtime) pair that identifies a book version"""
+        stat = os.stat(file_path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def get(self, file_path):
+        """Return cached book data, or None if missing, stale or corrupt
+
+        The chapter texts are not in the returned dict; its "store" is an open
+        ChapterStore that the caller must close.
+        """
+        entry_path = self._entry_path(file_path)
+        if not os.path.exists(entry_path):
+            return None
+
+        try:
+            size, mtime = self.fingerprint(file_path)
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if (data.get("version") != CACHE_VERSION or
+                    data.get("path") != os.path.abspath(file_path) or
+                    data.get("size") != size or data.get("mtime") != mtime or
+                    not isinstance(data.get("chapters"), list) or
+                    not os.path.exists(os.path.join(self.cache_dir, data.get("store", "")))):
+                print(f"♻️ Stale cache entry for {file_path}")
+                self._remove_book(file_path)
+                return None
+
+            data["store"] = ChapterStore(os.path.join(self.cache_dir, data["store"]))
+            if len(data["store"]) != len(data["chapters"]):
+                data["store"].close()
+                raise ValueError("chapter store does not match the chapter list")
+
+            # Touch the entry so eviction treats it as recently used
+            os.utime(entry_path, None)
+            return data
+        except Exception as e:
+            print(f"❌ Corrupt cache entry for {file_path}: {e}")
+            self._remove_book(file_path)
+            return None
+
+    def put(self, file_path, title, author, chapters, nav=None):
+        """Store a parsed book and evict old entries if over budget
+
+        chapters is a list of dicts with href, title, length, images and
+        content (None if not extracted), and nav the JSON form of its NavIndex. Returns an open ChapterStore of the written text, or None
+        if the book could not be cached.
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            size, mtime = self.fingerprint(file_path)
+            key = self._key(file_path)
+
+            # Every write gets a new store file, so a store another reader still
+            # has mapped is never overwritten in place
+            fd, store_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f"{key}.", suffix=".txt")
+            os.close(fd)
+            try:
+                ChapterStore.write(store_path, [chapter['content'] for chapter in chapters])
+                data = {
+                    "version": CACHE_VERSION,
+                    "path": os.path.abspath(file_path),
+                    "size": size,
+                    "mtime": mtime,
+                    "title": title,
+                    "author": author,
+                    "store": os.path.basename(store_path),
+                    "nav": nav or [],
+                    "chapters": [{'href': chapter['href'], 'title': chapter['title'], 'length': chapter.get('length'),
+                                  'images': chapter.get('images')}
+                                 for chapter in chapters]
+                }
+
+                # Write to a temp file and rename so readers never see a partial entry
+                entry_path = self._entry_path(file_path)
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+                try:
+                    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                        json.dump(data, f, ensure_ascii=False)
+                    os.replace(tmp_path, entry_path)
+                except Exception:
+                    self._remove(tmp_path)
+                    raise
+            except Exception:
+                self._remove(store_path)
+                raise
+
+            # Older stores of this book; removal fails harmlessly on Windows while one is still mapped
+            for name in os.listdir(self.cache_dir):
+                if name.startswith(f"{key}.") and name.endswith(".txt") and name != data["store"]:
+                    self._remove(os.path.join(self.cache_dir, name))
+
+            # Mapped before evicting, and this book is kept even if it alone exceeds max_bytes
+            store = ChapterStore(store_path)
+            self.evict(keep=file_path)
+            return store
+        except Exception as e:
+            print(f"❌ Error writing book cache: {e}")
+            return None
+
+    def evict(self, keep=None):
+        """Remove least recently used books, with their sidecar files, until the cache fits max_bytes
+
+        The files of the book at path keep, usually the one just written, are never removed.
+        """
+        kept_key = self._key(keep) if keep is not None else None
+        kept_size = 0
+        try:
+            books = {}
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                if not os.path.isfile(path) or name.endswith(".tmp"):
+                    continue
+                stat = os.stat(path)
+                key = name.split('.', 1)[0]
+                if key == kept_key:
+                    kept_size += stat.st_size
+                    continue
+                last_used, size, paths = books.get(key, (0, 0, []))
+                books[key] = (max(last_used, stat.st_mtime), size + stat.st_size, paths + [path])
+        except OSError:
+            return
+
+        # The kept book still counts, so the others make room for it
+        total = kept_size + sum(size for _, size, _ in books.values())
+        for last_used, size, paths in sorted(books.values()):
+            if total <= self.max_bytes:
+                break
+            for path in paths:
+                self._remove(path)
+            total -= size
+            print(f"🗑️ Evicted cache entry: {paths[0]}")
+
+    def clear(self):
+        """Remove every cache entry"""
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                self._remove(os.path.join(self.cache_dir, name))
+
+    def _remove_book(self, file_path):
+        """Remove a book's entry with its chapter stores and every sidecar file"""
+        prefix = f"{self._key(file_path)}."
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+        for name in names:
+            if name.startswith(prefix):
+                self._remove(os.path.join(self.cache_dir, name))
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
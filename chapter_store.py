@@ -0,0 +1,92 @@
+"""
+Memory-mapped chapter text for EPUB Reader
+
+A book's chapter texts are written once to a single file: a small header, a
+table of byte offsets and the UTF-8 text of every chapter back to back. The
+file is then memory-mapped, so the operating system pages text in and out
+as needed instead of the whole book living in Python strings (4 bytes per
+character for CJK). Only the few most recently read chapters are kept
+decoded.
+"""
+
+import mmap
+import struct
+import threading
+from array import array
+from collections import OrderedDict
+
+MAGIC = b"EPTX"
+STORE_VERSION = 1
+# magic, version, chapter count
+HEADER = struct.Struct("<4sII")
+
+
+class ChapterStore:
+    """Read-only chapter texts served from a memory-mapped file"""
+
+    def __init__(self, path, cache_chapters=4):
+        self.path = path
+        self.cache_chapters = cache_chapters
+        self._decoded = OrderedDict()
+        self._lock = threading.Lock()
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, count = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or version != STORE_VERSION:
+                raise ValueError(f"Not a chapter store: {path}")
+            # count + 1 byte offsets into the text, then one presence flag per chapter
+            table_end = HEADER.size + 8 * (count + 1)
+            self._offsets = array('Q', self._map[HEADER.size:table_end])
+            self._present = self._map[table_end:table_end + count]
+            self._text_start = table_end + count
+            if len(self._present) != count or self._text_start + self._offsets[-1] > len(self._map):
+                raise ValueError(f"Truncated chapter store: {path}")
+        except Exception:
+            self._map.close()
+            raise
+
+    @staticmethod
+    def write(path, texts):
+        """Write texts (None for chapters not extracted yet) to path"""
+        offsets = array('Q', [0])
+        present = bytearray()
+        encoded = []
+        for text in texts:
+            data = text.encode('utf-8') if text is not None else b""
+            encoded.append(data)
+            present.append(text is not None)
+            offsets.append(offsets[-1] + len(data))
+
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, STORE_VERSION, len(encoded)))
+            f.write(offsets.tobytes())
+            f.write(present)
+            for data in encoded:
+                f.write(data)
+
+    def has(self, index):
+        return bool(self._present[index])
+
+    def text(self, index):
+        """Return the text of a chapter, decoding it from the map if not recently used"""
+        with self._lock:
+            text = self._decoded.get(index)
+            if text is not None:
+                self._decoded.move_to_end(index)
+                return text
+            start = self._text_start + self._offsets[index]
+            end = self._text_start + self._offsets[index + 1]
+            text = self._map[start:end].decode('utf-8')
+            self._decoded[index] = text
+            while len(self._decoded) > self.cache_chapters:
+                self._decoded.popitem(last=False)
+            return text
+
+    def __len__(self):
+        return len(self._present)
+
+    def close(self):
+        with self._lock:
+            self._decoded.clear()
+            self._map.close()
@@ -0,0 +1,389 @@
+"""
+Offline dictionary lookup for EPUB Reader
+
+Reads StarDict dictionaries: a .ifo description, a sorted .idx of headwords
+and a .dict (or dictzip .dict.dz) of definitions. The files are memory-mapped
+and never read whole. A word is found by binary search over the .idx,
+through a table of where each entry starts, and only its definition is read
+from the .dict. The table is built in one pass over the .idx and cached on
+disk, where it is memory-mapped as well.
+
+Recent lookups are kept in an LRU cache. Words that are not found are
+retried without common English inflections: plurals, -ed, -ing and
+comparatives.
+"""
+
+import os
+import re
+import html
+import mmap
+import struct
+import hashlib
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+
+OFFSETS_MAGIC = b"EPOF"
+OFFSETS_VERSION = 1
+# magic, version, .idx size, .idx mtime, typecode of the offsets
+OFFSETS_HEADER = struct.Struct("<4sIQq4s")
+
+# Definition types that hold markup rather than plain text
+MARKUP_TYPES = "hgx"
+_TAG = re.compile(r"<[^>]+>")
+_BREAK = re.compile(r"<br\s*/?>|</p>|</div>", re.IGNORECASE)
+
+GZIP_FEXTRA = 4
+GZIP_FNAME = 8
+GZIP_FCOMMENT = 16
+GZIP_FHCRC = 2
+
+
+def word_forms(word):
+    """Yield a word, its lowercase form and then candidate base forms, without repeats"""
+    seen = set()
+    lower = word.lower()
+    candidates = [word, lower]
+    if lower.endswith("'s"):
+        candidates.append(lower[:-2])
+
+    # Forms that usually exist come first: stopped -> stop before stopp, baked -> bake before bak
+    for suffix, replacements in (("ies", ("y",)), ("ied", ("y",)), ("es", ("e", "")), ("s", ("",)),
+                                 ("ing", ("e", "")), ("ed", ("e", "")),
+                                 ("iest", ("y",)), ("ier", ("y",)), ("est", ("e", "")), ("er", ("e", ""))):
+        if lower.endswith(suffix) and len(lower) > len(suffix) + 2:
+            stem = lower[:-len(suffix)]
+            if len(stem) > 2 and stem[-1] == stem[-2] and stem[-1] not in "aeiouls":
+                candidates.append(stem[:-1])
+            candidates.extend(stem + replacement for replacement in replacements)
+
+    for candidate in candidates:
+        if candidate and candidate not in seen:
+            seen.add(candidate)
+            yield candidate
+
+
+def read_ifo(path):
+    """Return the key=value pairs of a StarDict .ifo file"""
+    info = {}
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        if not f.readline().startswith("StarDict's dict ifo file"):
+            raise ValueError(f"Not a StarDict .ifo file: {path}")
+        for line in f:
+            key, sep, value = line.partition("=")
+            if sep:
+                info[key.strip()] = value.strip()
+    return info
+
+
+class DictZipFile:
+    """Random access to a dictzip file: gzip whose data is deflated in independent chunks
+
+    The gzip header's RA field lists the compressed size of every chunk, so a
+    read only inflates the chunks it touches.
+    """
+
+    def __init__(self, path, cache_chunks=8):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._chunks = OrderedDict()
+        self._lock = threading.Lock()
+        self.cache_chunks = cache_chunks
+        try:
+            self._read_header()
+        except Exception:
+            self._map.close()
+            raise
+
+    def _read_header(self):
+        data = self._map
+        if data[:3] != b"\x1f\x8b\x08":
+            raise ValueError("Not a gzip file")
+        flags = data[3]
+        if not flags & GZIP_FEXTRA:
+            raise ValueError("Not a dictzip file: no random access table")
+        extra_length = struct.unpack_from("<H", data, 10)[0]
+        position = 12
+        extra_end = position + extra_length
+        self.chunk_length = None
+        sizes = ()
+        while position + 4 <= extra_end:
+            field_id = data[position:position + 2]
+            field_length = struct.unpack_from("<H", data, position + 2)[0]
+            if field_id == b"RA":
+                _, self.chunk_length, count = struct.unpack_from("<HHH", data, position + 4)
+                sizes = struct.unpack_from(f"<{count}H", data, position + 10)
+            position += 4 + field_length
+        if self.chunk_length is None:
+            raise ValueError("Not a dictzip file: no random access table")
+
+        position = extra_end
+        if flags & GZIP_FNAME:
+            position = data.find(b"\0", position) + 1
+        if flags & GZIP_FCOMMENT:
+            position = data.find(b"\0", position) + 1
+        if flags & GZIP_FHCRC:
+            position += 2
+        self._offsets = [position]
+        for size in sizes:
+            self._offsets.append(self._offsets[-1] + size)
+
+    def _chunk(self, index):
+        with self._lock:
+            chunk = self._chunks.get(index)
+            if chunk is None:
+                start, end = self._offsets[index], self._offsets[index + 1]
+                chunk = zlib.decompressobj(-zlib.MAX_WBITS).decompress(self._map[start:end])
+                self._chunks[index] = chunk
+                while len(self._chunks) > self.cache_chunks:
+                    self._chunks.popitem(last=False)
+            else:
+                self._chunks.move_to_end(index)
+            return chunk
+
+    def read(self, offset, size):
+        first = offset // self.chunk_length
+        last = (offset + size - 1) // self.chunk_length
+        data = b"".join(self._chunk(index) for index in range(first, last + 1))
+        start = offset - first * self.chunk_length
+        return data[start:start + size]
+
+    def close(self):
+        self._map.close()
+
+
+class _MappedFile:
+    """Random access to an uncompressed .dict"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def read(self, offset, size):
+        return self._map[offset:offset + size]
+
+    def close(self):
+        self._map.close()
+
+
+class StarDict:
+    """One StarDict dictionary, searched by binary search over its memory-mapped .idx"""
+
+    def __init__(self, ifo_path, cache_dir=None):
+        info = read_ifo(ifo_path)
+        base = ifo_path[:-len(".ifo")]
+        self.name = info.get("bookname") or os.path.basename(base)
+        self.types = info.get("sametypesequence", "")
+        self.cache_dir = cache_dir
+        self.idx_path = base + ".idx"
+        if not os.path.exists(self.idx_path):
+            raise ValueError(f"{self.name}: missing or compressed .idx (only plain .idx files are supported)")
+
+        # Every entry is the headword, a NUL, then the definition's offset and size in the .dict
+        offset_bits = info.get("idxoffsetbits", "32")
+        self._location = struct.Struct(">QI" if offset_bits == "64" else ">II")
+
+        with open(self.idx_path, 'rb') as f:
+            self._idx = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if os.path.exists(base + ".dict"):
+                self._dict = _MappedFile(base + ".dict")
+            elif os.path.exists(base + ".dict.dz"):
+                self._dict = DictZipFile(base + ".dict.dz")
+            else:
+                raise ValueError(f"{self.name}: no .dict or .dict.dz file")
+        except Exception:
+            self._idx.close()
+            raise
+        self._offsets = None
+        self._offsets_map = None
+        self._lock = threading.Lock()
+
+    def _entry_offsets(self):
+        """Return the start of every .idx entry, loading or building the table on first use"""
+        if self._offsets is None:
+            with self._lock:
+                if self._offsets is None:
+                    self._offsets = self._load_offsets() or self._build_offsets()
+        return self._offsets
+
+    def _offsets_path(self):
+        if not self.cache_dir:
+            return None
+        key = hashlib.sha1(os.path.abspath(self.idx_path).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"dict-{key}.oft")
+
+    def _load_offsets(self):
+        path = self._offsets_path()
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            stat = os.stat(self.idx_path)
+            with open(path, 'rb') as f:
+                table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, size, mtime, typecode = OFFSETS_HEADER.unpack_from(table, 0)
+            if (magic, version, size, mtime) != (OFFSETS_MAGIC, OFFSETS_VERSION, stat.st_size, stat.st_mtime_ns):
+                table.close()
+                return None
+            self._offsets_map = table
+            return memoryview(table)[OFFSETS_HEADER.size:].cast(typecode.rstrip(b"\0").decode('ascii'))
+        except (OSError, ValueError, struct.error) as e:
+            print(f"⚠️ Ignoring dictionary offset cache {path}: {e}")
+            return None
+
+    def _build_offsets(self):
+        """Scan the .idx once for the start of every entry and cache the table"""
+        idx = self._idx
+        offsets = array('I' if len(idx) < 2 ** 32 else 'Q')
+        entry_tail = 1 + self._location.size
+        position = 0
+        end = len(idx)
+        find = idx.find
+        while position < end:
+            offsets.append(position)
+            position = find(b"\0", position) + entry_tail
+            if position < entry_tail:
+                break
+
+        path = self._offsets_path()
+        if path is not None:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                stat = os.stat(self.idx_path)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(OFFSETS_HEADER.pack(OFFSETS_MAGIC, OFFSETS_VERSION, stat.st_size, stat.st_mtime_ns,
+                                                offsets.typecode.encode('ascii')))
+                    f.write(offsets.tobytes())
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"⚠️ Could not cache dictionary offsets: {e}")
+        return offsets
+
+    def __len__(self):
+        return len(self._entry_offsets())
+
+    def _headword(self, index):
+        """Return an entry's headword bytes and the position of its terminating NUL"""
+        start = self._entry_offsets()[index]
+        end = self._idx.find(b"\0", start)
+        return self._idx[start:end], end
+
+    def lookup(self, word):
+        """Return [(headword, definition)] for a word, matching case-insensitively, exact case first"""
+        target = word.encode('utf-8').lower()
+        offsets = self._entry_offsets()
+
+        # StarDict sorts headwords by ASCII case-insensitive comparison, i.e. by bytes.lower()
+        lo, hi = 0, len(offsets)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._headword(mid)[0].lower() < target:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        results = []
+        while lo < len(offsets):
+            headword, end = self._headword(lo)
+            if headword.lower() != target:
+                break
+            offset, size = self._location.unpack_from(self._idx, end + 1)
+            results.append((headword.decode('utf-8', errors='replace'), self._definition(offset, size)))
+            lo += 1
+        results.sort(key=lambda result: result[0] != word)
+        return results
+
+    def _definition(self, offset, size):
+        data = self._dict.read(offset, size)
+        fields = []
+        position = 0
+        if self.types:
+            # Types are given once in the .ifo; the last field runs to the end of the data
+            for i, kind in enumerate(self.types):
+                last = i == len(self.types) - 1
+                if kind.islower():
+                    end = len(data) if last else data.find(b"\0", position)
+                    end = len(data) if end < 0 else end
+                    fields.append((kind, data[position:end]))
+                    position = end + 1
+                elif last:
+                    break
+                else:
+                    position += 4 + struct.unpack_from(">I", data, position)[0]
+        else:
+            while position < len(data):
+                kind = chr(data[position])
+                position += 1
+                if kind.islower():
+                    end = data.find(b"\0", position)
+                    end = len(data) if end < 0 else end
+                    fields.append((kind, data[position:end]))
+                    position = end + 1
+                else:
+                    position += 4 + struct.unpack_from(">I", data, position)[0]
+
+        texts = []
+        for kind, raw in fields:
+            text = raw.decode('utf-8', errors='replace')
+            if kind in MARKUP_TYPES:
+                text = html.unescape(_TAG.sub("", _BREAK.sub("\n", text)))
+            texts.append(text.strip())
+        return "\n".join(text for text in texts if text)
+
+    def close(self):
+        self._offsets = None
+        if self._offsets_map is not None:
+            self._offsets_map.close()
+            self._offsets_map = None
+        self._idx.close()
+        self._dict.close()
+
+
+class Dictionaries:
+    """Every StarDict dictionary under some directories, with an LRU cache of lookups"""
+
+    def __init__(self, directories, cache_dir=None, cache_size=256):
+        self.dictionaries = []
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        for directory in directories:
+            for dirpath, dirnames, filenames in os.walk(directory):
+                dirnames.sort()
+                for name in sorted(filenames):
+                    if name.endswith(".ifo"):
+                        try:
+                            self.dictionaries.append(StarDict(os.path.join(dirpath, name), cache_dir))
+                        except (OSError, ValueError) as e:
+                            print(f"❌ Could not open dictionary {name}: {e}")
+
+    def lookup(self, word):
+        """Return (form, [(dictionary name, headword, definition)]) for the first form of word that is found"""
+        word = word.strip()
+        with self._lock:
+            cached = self._cache.get(word)
+            if cached is not None:
+                self._cache.move_to_end(word)
+                return cached
+
+        result = (word, [])
+        for form in word_forms(word):
+            entries = [(dictionary.name, headword, definition)
+                       for dictionary in self.dictionaries
+                       for headword, definition in dictionary.lookup(form)]
+            if entries:
+                result = (form, entries)
+                break
+
+        with self._lock:
+            self._cache[word] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def close(self):
+        for dictionary in self.dictionaries:
+            dictionary.close()
+        self.dictionaries = []
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Batch EPUB-to-text converter using the EPUB Reader extraction engine
+
+Examples:
+    python epub2text.py ~/books -o ~/books-txt
+    python epub2text.py ~/books --format jsonl -o books.jsonl -j 8
+    python epub2text.py book.epub --format jsonl > book.jsonl
+
+Books are processed in parallel, one per worker process, and each result is
+written as soon as it is ready. Per-file timings go to stderr.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from epub_engine import BACKENDS, extract_book, find_epubs
+
+
+def convert_file(file_path, backend):
+    """Worker task: extract one book and time it"""
+    start = time.perf_counter()
+    try:
+        book = extract_book(file_path, backend=backend)
+        return file_path, book, None, time.perf_counter() - start
+    except Exception as e:
+        return file_path, None, str(e), time.perf_counter() - start
+
+
+def book_to_text(book):
+    """Render an extracted book as plain text"""
+    parts = [book['title'], book['author'], ""]
+    for chapter in book['chapters']:
+        if chapter['content']:
+            parts.append(chapter['content'])
+            parts.append("")
+    return "\n".join(parts)
+
+
+def book_to_jsonl(book):
+    """Render an extracted book as one JSON line per chapter"""
+    lines = []
+    for index, chapter in enumerate(book['chapters']):
+        lines.append(json.dumps({
+            'path': book['path'],
+            'title': book['title'],
+            'author': book['author'],
+            'chapter_index': index,
+            'chapter_title': chapter['title'],
+            'text': chapter['content']
+        }, ensure_ascii=False))
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def txt_output_path(file_path, source, output_dir):
+    """Mirror the source tree under the output directory"""
+    base = source if os.path.isdir(source) else os.path.dirname(source)
+    relative = os.path.relpath(file_path, base)
+    return os.path.join(output_dir, os.path.splitext(relative)[0] + ".txt")
+
+
+def run(args):
+    jobs = args.jobs or os.cpu_count() or 1
+    if args.format == "txt" and not args.output:
+        print("❌ --output directory is required for txt output", file=sys.stderr)
+        return 2
+
+    if args.format == "jsonl":
+        if args.output and args.output != "-":
+            jsonl_out = open(args.output, 'w', encoding='utf-8')
+        else:
+            sys.stdout.reconfigure(encoding='utf-8')
+            jsonl_out = sys.stdout
+
+    def write_result(file_path, book):
+        if args.format == "jsonl":
+            jsonl_out.write(book_to_jsonl(book))
+            jsonl_out.flush()
+        else:
+            out_path = txt_output_path(file_path, args.source, args.output)
+            os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+            with open(out_path, 'w', encoding='utf-8') as f:
+                f.write(book_to_text(book))
+
+    started = time.perf_counter()
+    done = 0
+    failed = 0
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            # Keep a bounded number of books in flight so huge trees stream
+            pending = set()
+            paths = find_epubs(args.source)
+            exhausted = False
+            while pending or not exhausted:
+                while not exhausted and len(pending) < jobs * 2:
+                    path = next(paths, None)
+                    if path is None:
+                        exhausted = True
+                    else:
+                        pending.add(pool.submit(convert_file, path, args.backend))
+                if not pending:
+                    break
+
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    file_path, book, error, elapsed = future.result()
+                    done += 1
+                    if error:
+                        failed += 1
+                        print(f"❌ {elapsed:7.2f}s  {file_path}: {error}", file=sys.stderr)
+                        continue
+                    write_result(file_path, book)
+                    chars = sum(len(chapter['content']) for chapter in book['chapters'])
+                    print(f"✅ {elapsed:7.2f}s  {file_path} ({len(book['chapters'])} chapters, {chars} chars)",
+                          file=sys.stderr)
+    finally:
+        if args.format == "jsonl" and jsonl_out is not sys.stdout:
+            jsonl_out.close()
+
+    total = time.perf_counter() - started
+    print(f"📚 {done - failed} of {done} books converted in {total:.2f}s with {jobs} workers",
+          file=sys.stderr)
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert EPUB files to plain text or JSONL.")
+    parser.add_argument("source", help="EPUB file or directory to search recursively")
+    parser.add_argument("-o", "--output",
+                        help="output directory for txt, or output file for jsonl (default: stdout)")
+    parser.add_argument("-f", "--format", choices=("txt", "jsonl"), default="txt")
+    parser.add_argument("-j", "--jobs", type=int, default=0, help="worker processes (default: one per CPU)")
+    parser.add_argument("--backend", choices=BACKENDS, default="lxml", help="text extraction backend")
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,797 @@
+"""
+EPUB parsing for EPUB Reader, independent of the GUI
+"""
+
+import os
+import re
+import codecs
+import posixpath
+import threading
+import zipfile
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+import xml.etree.ElementTree as ET
+from urllib.parse import unquote
+
+from bs4 import BeautifulSoup
+
+from nav_index import NavIndex
+from pagination import IMAGE_MARK
+from timing import tracer
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+CONTAINER_PATH = "META-INF/container.xml"
+DOCUMENT_MEDIA_TYPES = ("application/xhtml+xml", "text/html")
+NCX_MEDIA_TYPE = "application/x-dtbncx+xml"
+EPUB_TYPE = "{http://www.idpf.org/2007/ops}type"
+
+# Books with less HTML than this are extracted serially, since starting a
+# process pool costs more than it saves
+PARALLEL_MIN_BYTES = 2 * 1024 * 1024
+# Upper bound on the HTML sent to a worker in one task
+MAX_BATCH_BYTES = 4 * 1024 * 1024
+
+# Text extraction backends selectable through the "extraction_backend" setting
+BACKENDS = ("bs4", "lxml")
+SKIPPED_TAGS = frozenset(("script", "style"))
+# <img>, and <image> inside SVG
+IMAGE_TAGS = ("img", "image")
+XLINK_HREF = "{http://www.w3.org/1999/xlink}href"
+_DECLARED_ENCODING = re.compile(
+    rb'''<\?xml[^>]*encoding=["']([\w.-]+)|<meta[^>]*charset=["']?([\w.-]+)''', re.IGNORECASE)
+# Put into the raw text where an anchor starts; a noncharacter, so documents never contain it
+ANCHOR_MARK = "\uffff"
+
+
+def _to_number(text):
+    """Parse a series position such as "2" or "2.5", or return None"""
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def _local_name(tag):
+    """Strip the XML namespace from an element tag ("" for comments and processing instructions)"""
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ""
+
+
+def html_to_text(content, backend="bs4"):
+    """Convert an HTML/XHTML document to cleaned plain text"""
+    return clean_text(document_text(content, backend))
+
+
+def extract_document(content, backend="bs4", base="", keep_image_marks=True):
+    """Return a document's cleaned text and the zip paths of its images
+
+    Each image is an IMAGE_MARK in the text, and the paths are in the order
+    of the marks. base is the document's own path in the zip, which image
+    links are relative to. Without keep_image_marks the text is exactly what
+    html_to_text returns and no images are listed; only the reader's pages
+    need the marks.
+    """
+    if not keep_image_marks:
+        return html_to_text(content, backend), []
+    images = []
+    text = clean_text(document_text(content, backend, images))
+    directory = posixpath.dirname(base)
+    return text, [posixpath.normpath(posixpath.join(directory, unquote(src.split('#', 1)[0]))) for src in images]
+
+
+def document_text(content, backend="bs4", images=None):
+    """Return the raw text of a document, without script/style and before cleanup
+
+    Given a list for images, an IMAGE_MARK is put where each image is and
+    the image links are appended to the list.
+    """
+    if backend == "lxml" and etree is not None:
+        return _lxml_text(content, images)
+
+    soup = BeautifulSoup(content, 'html.parser')
+    # Remove script and style elements
+    for script in soup(["script", "style"]):
+        script.decompose()
+    if images is not None:
+        _mark_images(soup, images)
+
+    return soup.get_text()
+
+
+def _image_source(attrib):
+    """Return the link of an <img> or SVG <image> if it points inside the book, else None"""
+    src = attrib.get('src') or attrib.get(XLINK_HREF) or attrib.get('xlink:href') or attrib.get('href')
+    if not src or ':' in src.split('/', 1)[0]:
+        # Missing, or a data: or remote URL
+        return None
+    return src
+
+
+def _mark_images(soup, images):
+    """Replace the images of a BeautifulSoup tree by marks, collecting their links"""
+    for element in soup.find_all(IMAGE_TAGS):
+        src = _image_source(element.attrs)
+        if src is not None:
+            images.append(src)
+            element.replace_with(f" {IMAGE_MARK} ")
+
+
+def anchor_offsets(content, anchors, backend="bs4", keep_image_marks=True):
+    """Return {anchor: offset} giving where each id (or <a name>) starts in the document's cleaned text
+
+    A mark is placed in the raw text at every wanted anchor; cleaning keeps
+    it in place, so its position, less the marks before it, is the offset in
+    the text extract_document returns. Anchors that do not exist are left out.
+    """
+    if backend == "lxml" and etree is not None:
+        collector = _TextCollector(anchors, [] if keep_image_marks else None)
+        parser = etree.HTMLParser(target=collector)
+        parser.feed(_decode_html(content))
+        raw = parser.close()
+        found = collector.found
+    else:
+        soup = BeautifulSoup(content, 'html.parser')
+        for script in soup(["script", "style"]):
+            script.decompose()
+        if keep_image_marks:
+            _mark_images(soup, [])
+        found = []
+        for element in soup.find_all(lambda tag: tag.get('id') in anchors or tag.get('name') in anchors):
+            found.append(element.get('id') if element.get('id') in anchors else element.get('name'))
+            element.insert_before(ANCHOR_MARK)
+        raw = soup.get_text()
+
+    offsets = {}
+    text = clean_text(raw)
+    position = -1
+    for seen, anchor in enumerate(found):
+        position = text.find(ANCHOR_MARK, position + 1)
+        if position < 0:
+            break
+        offsets.setdefault(anchor, position - seen)
+    return offsets
+
+
+class _TextCollector:
+    """lxml parser target that keeps text outside script/style without building a tree
+
+    Given anchors, it also marks where elements with those ids start, and
+    given a list for images, where images are.
+    """
+
+    def __init__(self, anchors=(), images=None):
+        self.parts = []
+        self.skip_depth = 0
+        self.anchors = anchors
+        self.found = []
+        self.images = images
+
+    def start(self, tag, attrib):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+        elif self.images is not None and tag in IMAGE_TAGS and not self.skip_depth:
+            src = _image_source(attrib)
+            if src is not None:
+                self.images.append(src)
+                self.parts.append(f" {IMAGE_MARK} ")
+        if self.anchors:
+            anchor = attrib.get('id') if attrib.get('id') in self.anchors else attrib.get('name')
+            if anchor in self.anchors:
+                self.found.append(anchor)
+                self.parts.append(ANCHOR_MARK)
+
+    def end(self, tag):
+        if tag in SKIPPED_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+
+    def data(self, data):
+        if not self.skip_depth:
+            self.parts.append(data)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        return ''.join(self.parts)
+
+
+def _decode_html(content):
+    """Decode document bytes the way BeautifulSoup would: BOM, declared charset, UTF-8, cp1252"""
+    if isinstance(content, str):
+        return content
+    if content.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return content.decode('utf-16')
+    if content.startswith(codecs.BOM_UTF8):
+        return content[len(codecs.BOM_UTF8):].decode('utf-8', errors='replace')
+
+    match = _DECLARED_ENCODING.search(content[:1024])
+    if match:
+        declared = (match.group(1) or match.group(2)).decode('ascii')
+        try:
+            return content.decode(declared)
+        except (LookupError, UnicodeDecodeError):
+            pass
+    try:
+        return content.decode('utf-8')
+    except UnicodeDecodeError:
+        return content.decode('windows-1252', errors='replace')
+
+
+def _lxml_text(content, images=None):
+    """Stream a document through lxml's HTML parser, collecting text as it goes"""
+    parser = etree.HTMLParser(target=_TextCollector(images=images))
+    parser.feed(_decode_html(content))
+    return parser.close()
+
+
+def clean_text(text):
+    """Collapse line breaks and runs of spaces the way the reader displays them"""
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return ' '.join(chunk for chunk in chunks if chunk)
+
+
+_worker_zips = {}
+
+
+def _extract_batch(file_path, zip_paths, backend, keep_image_marks=True):
+    """Process pool task: read a batch of documents from the zip and return their text and images
+
+    Workers open the EPUB themselves so only member names go to the worker and
+    only text comes back.
+    """
+    archive = _worker_zips.get(file_path)
+    if archive is None:
+        archive = _worker_zips[file_path] = zipfile.ZipFile(file_path)
+    return [extract_document(archive.read(name), backend, name, keep_image_marks) for name in zip_paths]
+
+
+def _make_batches(zip_paths, sizes, target_bytes):
+    """Group consecutive documents into batches of roughly target_bytes"""
+    batches = []
+    batch = []
+    batch_bytes = 0
+    for name, size in zip(zip_paths, sizes):
+        batch.append(name)
+        batch_bytes += size
+        if batch_bytes >= target_bytes:
+            batches.append(batch)
+            batch = []
+            batch_bytes = 0
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def iter_extract_documents(file_path, zip_paths, workers=0, backend="bs4", keep_image_marks=True):
+    """Yield the (text, image paths) of the given zip members in order, each as soon as it is ready
+
+    workers=0 uses one process per CPU and workers=1 forces serial
+    extraction. Small books are always extracted serially. Closing the
+    generator early cancels batches that have not started.
+    """
+    workers = workers or os.cpu_count() or 1
+    with zipfile.ZipFile(file_path) as archive:
+        sizes = [archive.getinfo(name).file_size for name in zip_paths]
+        total = sum(sizes)
+        if workers == 1 or len(zip_paths) < 2 or total < PARALLEL_MIN_BYTES:
+            for name in zip_paths:
+                yield extract_document(archive.read(name), backend, name, keep_image_marks)
+            return
+
+    # Aim for a few batches per worker so uneven chapters still balance out
+    target_bytes = min(MAX_BATCH_BYTES, max(64 * 1024, total // (workers * 4)))
+    batches = _make_batches(zip_paths, sizes, target_bytes)
+    with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+        futures = [pool.submit(_extract_batch, file_path, batch, backend, keep_image_marks) for batch in batches]
+        try:
+            for future in futures:
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def iter_extract_texts(file_path, zip_paths, workers=0, backend="bs4"):
+    """Yield the text of the given zip members in order, each as soon as it is ready"""
+    for text, _ in iter_extract_documents(file_path, zip_paths, workers, backend, keep_image_marks=False):
+        yield text
+
+
+def extract_texts(file_path, zip_paths, workers=0, backend="bs4"):
+    """Extract the text of the given zip members, returned in the same order"""
+    return list(iter_extract_texts(file_path, zip_paths, workers, backend))
+
+
+class EpubSource:
+    """Reads metadata and the spine straight from the EPUB zip, without parsing documents"""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.zip = zipfile.ZipFile(file_path)
+        self._lock = threading.Lock()
+        try:
+            self.opf_path = self._find_opf()
+            self.opf_dir = posixpath.dirname(self.opf_path)
+            self._parse_opf()
+        except Exception:
+            self.zip.close()
+            raise
+
+    def _find_opf(self):
+        """Locate the package document through META-INF/container.xml"""
+        container = ET.fromstring(self.zip.read(CONTAINER_PATH))
+        for element in container.iter():
+            if _local_name(element.tag) == "rootfile" and element.get("full-path"):
+                return element.get("full-path")
+        raise ValueError("No rootfile found in container.xml")
+
+    def _parse_opf(self):
+        """Read title, author, series, cover, manifest and spine order from the OPF"""
+        package = ET.fromstring(self.zip.read(self.opf_path))
+
+        self.title = ""
+        self.author = ""
+        self.series = ""
+        self.series_index = None
+        manifest = {}
+        spine_ids = []
+        self.toc_id = None
+        cover_id = None
+        collections = {}
+        positions = {}
+        for element in package.iter():
+            name = _local_name(element.tag)
+            if name == "title" and not self.title and element.text:
+                self.title = element.text.strip()
+            elif name == "creator" and not self.author and element.text:
+                self.author = element.text.strip()
+            elif name == "meta":
+                # EPUB 2 and Calibre use name/content, EPUB 3 property and refines
+                meta_name, content = element.get("name"), element.get("content")
+                if meta_name == "cover":
+                    cover_id = content
+                elif meta_name == "calibre:series" and content:
+                    self.series = content.strip()
+                elif meta_name == "calibre:series_index":
+                    self.series_index = _to_number(content)
+                elif element.get("property") == "belongs-to-collection" and element.text:
+                    collections[element.get("id")] = element.text.strip()
+                elif element.get("property") == "group-position" and element.get("refines"):
+                    positions[element.get("refines").lstrip("#")] = _to_number(element.text)
+            elif name == "item" and element.get("id") and element.get("href"):
+                manifest[element.get("id")] = {
+                    'id': element.get("id"),
+                    'href': unquote(element.get("href")),
+                    'media_type': element.get("media-type", ""),
+                    'properties': element.get("properties", "")
+                }
+            elif name == "itemref" and element.get("idref"):
+                spine_ids.append(element.get("idref"))
+            elif name == "spine":
+                self.toc_id = element.get("toc")
+
+        self.manifest = manifest
+        self.spine = [manifest[idref] for idref in spine_ids
+                      if idref in manifest and manifest[idref]['media_type'] in DOCUMENT_MEDIA_TYPES]
+
+        if not self.series and collections:
+            collection_id, self.series = next(iter(collections.items()))
+            self.series_index = positions.get(collection_id)
+        self.cover_href = self._find_cover(cover_id)
+
+    def _find_cover(self, cover_id):
+        """Return the href of the cover image: EPUB 3 cover-image, else the EPUB 2 cover meta, else a guess"""
+        images = [item for item in self.manifest.values() if item['media_type'].startswith("image/")]
+        for item in images:
+            if "cover-image" in item['properties'].split():
+                return item['href']
+        if cover_id in self.manifest and self.manifest[cover_id]['media_type'].startswith("image/"):
+            return self.manifest[cover_id]['href']
+        for item in images:
+            if "cover" in item['id'].lower() or "cover" in posixpath.basename(item['href']).lower():
+                return item['href']
+        return None
+
+    def zip_path(self, href):
+        """Resolve an OPF-relative href to a member name in the zip"""
+        href = href.split('#', 1)[0]
+        return posixpath.normpath(posixpath.join(self.opf_dir, href)) if self.opf_dir else href
+
+    def read(self, href):
+        """Return the raw bytes of a resource referenced from the OPF"""
+        return self.read_member(self.zip_path(href))
+
+    def read_member(self, name):
+        """Return the raw bytes of a zip member"""
+        with self._lock:
+            return self.zip.read(name)
+
+    def read_toc(self):
+        """Return the table of contents as (title, level, zip path, fragment) tuples
+
+        The EPUB 3 nav document is used when there is one, else the EPUB 2 NCX.
+        """
+        items = self.manifest.values()
+        nav = next((item for item in items if 'nav' in item['properties'].split()), None)
+        if nav is not None:
+            toc = self._read_nav(nav)
+            if toc:
+                return toc
+        ncx = self.manifest.get(self.toc_id) or next(
+            (item for item in items if item['media_type'] == NCX_MEDIA_TYPE), None)
+        return self._read_ncx(ncx) if ncx is not None else []
+
+    def _parse_markup(self, item):
+        """Parse a manifest item as XML, falling back to lxml's forgiving HTML parser"""
+        data = self.read(item['href'])
+        try:
+            return ET.fromstring(data)
+        except ET.ParseError:
+            if etree is None:
+                raise
+            return etree.fromstring(data, etree.HTMLParser())
+
+    def _link_target(self, base, href):
+        """Resolve a link in a document at base to (zip path, fragment)"""
+        path, _, fragment = href.partition('#')
+        path = posixpath.normpath(posixpath.join(base, unquote(path))) if path else base
+        return path, unquote(fragment) or None
+
+    def _read_nav(self, item):
+        root = self._parse_markup(item)
+        base = posixpath.dirname(self.zip_path(item['href']))
+        navs = [element for element in root.iter() if _local_name(element.tag) == "nav"]
+        toc = next((nav for nav in navs
+                    if "toc" in (nav.get(EPUB_TYPE) or nav.get("epub:type") or "").split()),
+                   navs[0] if navs else None)
+        entries = []
+
+        def walk(ol, level):
+            for li in ol:
+                if _local_name(li.tag) != "li":
+                    continue
+                for child in li:
+                    name = _local_name(child.tag)
+                    # Entries without a link (<span>) are headings; their children still count
+                    if name == "a" and child.get("href"):
+                        title = clean_text(''.join(child.itertext()))
+                        if title:
+                            entries.append((title, level) + self._link_target(base, child.get("href")))
+                    elif name == "ol":
+                        walk(child, level + 1)
+
+        if toc is not None:
+            for child in toc:
+                if _local_name(child.tag) == "ol":
+                    walk(child, 0)
+        return entries
+
+    def _read_ncx(self, item):
+        root = self._parse_markup(item)
+        base = posixpath.dirname(self.zip_path(item['href']))
+        entries = []
+
+        def walk(parent, level):
+            for point in parent:
+                if _local_name(point.tag) != "navPoint":
+                    continue
+                title = src = None
+                for child in point:
+                    name = _local_name(child.tag)
+                    if name == "navLabel":
+                        title = clean_text(''.join(child.itertext()))
+                    elif name == "content":
+                        src = child.get("src")
+                if title and src:
+                    entries.append((title, level) + self._link_target(base, src))
+                walk(point, level + 1)
+
+        nav_map = next((element for element in root.iter() if _local_name(element.tag) == "navMap"), None)
+        if nav_map is not None:
+            walk(nav_map, 0)
+        return entries
+
+    def nav_index(self):
+        """Build the book's NavIndex; entries pointing outside the spine are dropped"""
+        chapters = {self.zip_path(item['href']): index for index, item in enumerate(self.spine)}
+        entries = []
+        for title, level, path, fragment in self.read_toc():
+            if path in chapters:
+                entries.append({'title': title, 'level': level, 'chapter': chapters[path],
+                                'anchor': fragment, 'offset': None if fragment else 0})
+        return NavIndex(entries)
+
+    def close(self):
+        self.zip.close()
+
+
+class LazyChapter:
+    """A spine document whose text is only extracted the first time it is read
+
+    Text comes from memory when it was just extracted, otherwise from the
+    book's chapter store, otherwise from the EPUB itself.
+    """
+
+    def __init__(self, chapters, index, href, title, content=None, length=None, images=None):
+        self._chapters = chapters
+        self.index = index
+        self.href = href
+        self.title = title
+        self._content = content
+        # Length of the text in characters, known once it has been extracted
+        self.length = len(content) if content is not None else length
+        # Zip paths of the images behind the text's image marks, in order
+        self.images = images
+        self._image_offsets = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_loaded(self):
+        return self._content is not None or self._chapters.stored(self.index)
+
+    @property
+    def content(self):
+        # Read the attribute once: use_store may drop it from another thread
+        content = self._content
+        if content is not None:
+            return content
+        if self._chapters.stored(self.index):
+            return self._chapters.store.text(self.index)
+        with self._lock:
+            content = self._content
+            if content is None:
+                source = self._chapters.source
+                with tracer.span("extract_chapter", href=self.href):
+                    content, self.images = extract_document(source.read(self.href), self._chapters.backend,
+                                                            source.zip_path(self.href),
+                                                            self._chapters.keep_image_marks)
+                self._content = content
+                self.length = len(content)
+                self._chapters.dirty = True
+            return content
+
+    def images_between(self, start, end):
+        """Return the (offset, zip path) of every image in [start, end) of the text"""
+        if not self.images:
+            return []
+        if self._image_offsets is None:
+            content = self.content
+            offsets = array('I')
+            position = content.find(IMAGE_MARK)
+            while position >= 0:
+                offsets.append(position)
+                position = content.find(IMAGE_MARK, position + 1)
+            self._image_offsets = offsets
+        first = bisect_left(self._image_offsets, start)
+        last = bisect_left(self._image_offsets, end)
+        return [(self._image_offsets[i], self.images[i])
+                for i in range(first, min(last, len(self.images)))]
+
+    def __getitem__(self, key):
+        if key == 'title':
+            return self.title
+        if key == 'content':
+            return self.content
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+class LazyChapters:
+    """Spine-ordered chapter list that parses each document on demand
+
+    keep_image_marks=False gives plain text without image marks, for tools
+    that do not show pages.
+    """
+
+    def __init__(self, file_path, entries, source=None, backend="bs4", store=None, nav=None,
+                 keep_image_marks=True):
+        self.file_path = file_path
+        self.backend = backend
+        self.keep_image_marks = keep_image_marks
+        self._source = source
+        self._source_lock = threading.Lock()
+        self.store = store
+        self.nav = nav if nav is not None else NavIndex()
+        self._retired_stores = []
+        self.dirty = False
+        self._items = [LazyChapter(self, i, entry['href'],
+                                   entry.get('title') or f"Chapter {i + 1}",
+                                   entry.get('content'), entry.get('length'), entry.get('images'))
+                       for i, entry in enumerate(entries)]
+
+    @classmethod
+    def from_source(cls, source, backend="bs4", keep_image_marks=True):
+        """Build the chapter list from an opened EPUB's spine, titled from its table of contents"""
+        try:
+            nav = source.nav_index()
+        except Exception:
+            # A broken table of contents should not stop the book from opening
+            nav = NavIndex()
+        names = [posixpath.splitext(posixpath.basename(item['href']))[0] for item in source.spine]
+        entries = [{'href': item['href'], 'title': title}
+                   for item, title in zip(source.spine, nav.chapter_titles(names))]
+        chapters = cls(source.file_path, entries, source, backend, nav=nav, keep_image_marks=keep_image_marks)
+        chapters.dirty = True
+        return chapters
+
+    @property
+    def source(self):
+        """The zip reader, opened only once a chapter actually needs parsing"""
+        if self._source is None:
+            with self._source_lock:
+                if self._source is None:
+                    self._source = EpubSource(self.file_path)
+        return self._source
+
+    def stored(self, index):
+        store = self.store
+        return store is not None and store.has(index)
+
+    def use_store(self, store):
+        """Serve chapters from a newly written store and drop their in-memory text"""
+        if self.store is not None:
+            # Another thread may still be reading from it; it is closed with the book
+            self._retired_stores.append(self.store)
+        self.store = store
+        for chapter in self._items:
+            if store.has(chapter.index):
+                chapter._content = None
+        self.dirty = False
+
+    def to_cache(self):
+        """Return the chapter list in the form stored by BookCache"""
+        return [{'href': chapter.href, 'title': chapter.title, 'length': chapter.length, 'images': chapter.images,
+                 'content': chapter.content if chapter.is_loaded else None}
+                for chapter in self._items]
+
+    def iter_load(self, workers=0, first=0):
+        """Extract every chapter that is not loaded yet, yielding each index as its text arrives
+
+        Chapter first is extracted before the others so it can be shown
+        while the rest of the book is still being parsed.
+        """
+        pending = [chapter for chapter in self._items if not chapter.is_loaded]
+        pending.sort(key=lambda chapter: chapter.index != first)
+        if not pending:
+            return
+
+        zip_paths = [self.source.zip_path(chapter.href) for chapter in pending]
+        documents = iter_extract_documents(self.file_path, zip_paths, workers, self.backend, self.keep_image_marks)
+        for chapter, (text, images) in zip(pending, documents):
+            chapter._content = text
+            chapter.length = len(text)
+            chapter.images = images
+            self.dirty = True
+            yield chapter.index
+
+    def load_all(self, workers=0):
+        """Extract every chapter that is not loaded yet, using a process pool for large books"""
+        for _ in self.iter_load(workers):
+            pass
+
+    def locate(self, entry_index):
+        """Return the (chapter, offset) of a table of contents entry, locating its anchor if needed"""
+        entry = self.nav.entries[entry_index]
+        if entry['offset'] is None:
+            self.resolve_anchors([entry['chapter']])
+        return entry['chapter'], entry['offset']
+
+    def resolve_anchors(self, chapter_indexes=None):
+        """Find the text offsets of table of contents anchors, in the given chapters or all of them"""
+        for index in chapter_indexes if chapter_indexes is not None else self.nav.unresolved():
+            anchors = self.nav.anchors(index)
+            if not anchors:
+                continue
+            with tracer.span("resolve_anchors", chapter=index, anchors=len(anchors)):
+                offsets = anchor_offsets(self.source.read(self._items[index].href), anchors, self.backend,
+                                         self.keep_image_marks)
+            self.nav.set_offsets(index, offsets)
+            self.dirty = True
+
+    def lengths(self):
+        """Return the length of every chapter's text, or None while some are not extracted yet"""
+        lengths = [chapter.length for chapter in self._items]
+        return None if None in lengths else lengths
+
+    def loaded_count(self):
+        return sum(1 for chapter in self._items if chapter.is_loaded)
+
+    def close(self):
+        """Release the zip, the chapter stores and any extracted text"""
+        if self._source is not None:
+            self._source.close()
+            self._source = None
+        for chapter in self._items:
+            chapter._content = None
+        for store in self._retired_stores + [self.store]:
+            if store is not None:
+                store.close()
+        self._retired_stores = []
+        self.store = None
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __bool__(self):
+        return bool(self._items)
+
+
+def open_book(file_path, cached=None, backend="bs4", keep_image_marks=True):
+    """Return (title, author, chapters) after reading only the OPF and spine
+
+    When a BookCache entry is given, chapters already extracted in an earlier
+    session are reused and the zip is not opened until a new chapter is needed.
+    """
+    if cached:
+        chapters = LazyChapters(file_path, cached["chapters"], backend=backend, store=cached.get("store"),
+                                nav=NavIndex.from_json(cached.get("nav")))
+        return cached["title"], cached["author"], chapters
+
+    source = EpubSource(file_path)
+    chapters = LazyChapters.from_source(source, backend, keep_image_marks)
+    return (source.title or "Unknown Title",
+            source.author or "Unknown Author",
+            chapters)
+
+
+def extract_book(file_path, backend="bs4", workers=1):
+    """Parse a whole book and return its metadata and every chapter's text
+
+    This is the same pipeline the reader uses, without any GUI. The result is
+    a dict with path, title, author and a spine-ordered list of chapters,
+    each with href, title and content. Images are left out of the text.
+    """
+    title, author, chapters = open_book(file_path, backend=backend, keep_image_marks=False)
+    try:
+        chapters.load_all(workers)
+        return {
+            'path': file_path,
+            'title': title,
+            'author': author,
+            'chapters': chapters.to_cache()
+        }
+    finally:
+        chapters.close()
+
+
+def find_epubs(source):
+    """Yield every .epub under a directory tree, or the file itself"""
+    if os.path.isfile(source):
+        yield source
+        return
+    for dirpath, dirnames, filenames in os.walk(source):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(".epub"):
+                yield os.path.join(dirpath, name)
+
+
+def compare_backends(file_path, backends=BACKENDS):
+    """Extract every spine document with each backend and return the hrefs whose text differs"""
+    source = EpubSource(file_path)
+    try:
+        mismatches = []
+        for item in source.spine:
+            content = source.read(item['href'])
+            texts = [html_to_text(content, backend) for backend in backends]
+            if any(text != texts[0] for text in texts[1:]):
+                mismatches.append(item['href'])
+        return mismatches
+    finally:
+        source.close()
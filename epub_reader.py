@@ -1,16 +1,24 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, scrolledtext, colorchooser
-import ebooklib
-from ebooklib import epub
-from bs4 import BeautifulSoup
+from tkinter import ttk, filedialog, messagebox, colorchooser, simpledialog
+import tkinter.font as tkfont
 import os
 import re
 import json
-from PIL import Image, ImageTk
-import io
+import time
+import queue
 import threading
-import webbrowser
-from pathlib import Path
+from concurrent.futures import Future
+from book_cache import BookCache, CACHE_VERSION
+from search_index import SearchIndex, make_snippet
+from pagination import FontMetrics, Paginator, PageLayout, PageCache
+from settings_store import SettingsStore
+from highlights import HighlightStore
+from reading_position import BookPositions, ReadingSpeed, format_minutes
+from virtual_list import VirtualList
+from timing import tracer
+
+# Reference point for the startup-to-last-page latency
+STARTUP_TIME = time.perf_counter()
 
 class EpubReader:
     def __init__(self, root):
@@ -28,6 +36,9 @@ class EpubReader:
         # Load settings or use defaults
         self.settings_file = "epub_reader_settings.json"
         self.load_settings()
+        self.settings_store = SettingsStore(self.settings_file, on_error=self.on_settings_error)
+        self.book_cache = BookCache(max_bytes=self.settings["book_cache_max_mb"] * 1024 * 1024)
+        tracer.enabled = self.settings["timing_enabled"]
         
         # Initialize reading session data
         self.current_book_path = ""
@@ -35,19 +46,68 @@ class EpubReader:
         self.chapters = []
         self.book_title = ""
         self.book_author = ""
+        self.search_index = None
+        self.search_window = None
+        # Highlights and notes of the open book
+        self.highlights = None
+        # Cumulative chapter lengths, built once every chapter of the book has been extracted
+        self.positions = None
+        self.spread_shown_at = None
+        # Book images: decoded off the Tk thread and cached by size; Pillow is imported on first use
+        self.image_loader = None
+        self.image_cache = None
+        self.image_placeholder = None
+        self.page_photos = []
+        self.pending_images = {}
+        self.broken_images = set()
+        self.library_index = None
+        self.library_window = None
+        self.catalog_window = None
+        self.catalog_books = []
+        # One scan feeds both library windows; folders added while it runs are scanned after it
+        self.library_scanning = False
+        self.library_scan_queue = []
+        self.dictionaries = None
+        self.dictionary_lock = threading.Lock()
+        self.start_chapter = 0
+        self.start_offset = 0
+        # Loading progress published by load threads and drained on the Tk thread; only
+        # events of the current generation are applied, and older loads are cancelled
+        self.load_events = queue.Queue()
+        self.load_generation = 0
+        self.load_cancel = None
+        # Threads still working on the open book's chapters, and the one writing the last closed book
+        self.book_threads = []
+        self.closing_thread = None
+        self.chapter_ready = bytearray()
+        self.listed_chapters = 0
+        self.book_shown = False
+        self.snapshot_file = "epub_reader_snapshot.json"
+        
+        # Pagination: the left page of the current spread and cached page breaks
+        self.current_page = 0
+        self.current_offset = 0
+        self.spread = ((0, 0), (0, 0))
+        self.page_cache = PageCache()
+        self.font_metrics = {}
         
         self.setup_ui()
         self.apply_theme()
         
+        # Paint the last spread before the first frame; the live book replaces it once loaded
+        self.snapshot = None
+        if self.settings.get("auto_load_last_book", True) and self.settings.get("warm_start", True):
+            self.show_snapshot()
+        
         # Bind window close event to save settings
         self.root.protocol("WM_DELETE_WINDOW", self.on_exit)
         
         # Restore sidebar width after a short delay to ensure UI is ready
         self.root.after(100, self.restore_sidebar_width)
         
-        # Auto-load last book if enabled
+        # Auto-load last book if enabled, as soon as the window has been drawn
         if self.settings.get("auto_load_last_book", True):
-            self.root.after(500, self.auto_load_last_book)
+            self.root.after_idle(self.auto_load_last_book)
         
     def load_settings(self):
         """Load settings from JSON file or use defaults"""
@@ -63,7 +123,21 @@ class EpubReader:
             "sidebar_width": 250,
             "last_book_path": "",
             "last_chapter": 0,
-            "auto_load_last_book": True
+            "last_offset": 0,
+            "reading_speed_cpm": 1000,
+            "image_cache_mb": 64,
+            "auto_load_last_book": True,
+            "book_cache_max_mb": 200,
+            "extraction_mode": "lazy",
+            "extraction_workers": 0,
+            "extraction_backend": "bs4",
+            "timing_enabled": True,
+            "search_index_enabled": True,
+            "library_folders": [],
+            "library_db": "epub_library.db",
+            "cover_cache_dir": "epub_reader_covers",
+            "dictionary_folders": ["dictionaries"],
+            "warm_start": True
         }
         
         try:
@@ -90,7 +164,7 @@ class EpubReader:
         self.bg_color = self.settings["bg_color"]
         self.text_color = self.settings["text_color"]
         self.two_page_mode = self.settings["two_page_mode"]
-        self.highlights = {}  # Store text highlights
+        self.reading_speed = ReadingSpeed(self.settings["reading_speed_cpm"])
         
         # Set window size
         window_width = self.settings.get("window_width", 1200)
@@ -105,32 +179,96 @@ class EpubReader:
             except:
                 pass  # Ignore errors if paned window isn't ready yet
         
+    @tracer.timed("save_settings")
     def save_settings(self):
-        """Save current settings to JSON file"""
-        try:
-            # Update settings with current values
-            self.settings.update({
-                "font_size": self.font_size,
-                "font_family": self.font_family,
-                "dark_mode": self.dark_mode,
-                "bg_color": self.bg_color,
-                "text_color": self.text_color,
-                "two_page_mode": self.two_page_mode,
-                "window_width": self.root.winfo_width(),
-                "window_height": self.root.winfo_height(),
-                "sidebar_width": self.paned_window.sashpos(0) if hasattr(self, 'paned_window') else 250,
-                "last_book_path": self.current_book_path,
-                "last_chapter": self.current_chapter,
-                "auto_load_last_book": self.settings.get("auto_load_last_book", True)
-            })
+        """Queue the current settings to be written by the settings store"""
+        # Update settings with current values
+        self.settings.update({
+            "font_size": self.font_size,
+            "font_family": self.font_family,
+            "dark_mode": self.dark_mode,
+            "bg_color": self.bg_color,
+            "text_color": self.text_color,
+            "two_page_mode": self.two_page_mode,
+            "last_book_path": self.current_book_path,
+            "last_chapter": self.current_chapter,
+            "last_offset": self.current_offset,
+            "reading_speed_cpm": round(self.reading_speed.chars_per_minute),
+            "auto_load_last_book": self.settings.get("auto_load_last_book", True)
+        })
+        self.settings_store.save(self.settings)
+        
+    def remember_window_layout(self):
+        """Record the window size and sidebar width; only needed when saving explicitly or on exit"""
+        self.settings.update({
+            "window_width": self.root.winfo_width(),
+            "window_height": self.root.winfo_height(),
+            "sidebar_width": self.paned_window.sashpos(0) if hasattr(self, 'paned_window') else 250
+        })
+        
+    def save_settings_now(self):
+        """Save settings including the window layout and wait until they are written"""
+        self.remember_window_layout()
+        self.save_settings()
+        self.settings_store.flush()
+        
+    def on_settings_error(self, error):
+        """Report a failed background settings write on the UI thread"""
+        self.root.after(0, lambda: messagebox.showerror("Settings Error", f"Failed to save settings: {error}"))
             
-            with open(self.settings_file, 'w', encoding='utf-8') as f:
-                json.dump(self.settings, f, indent=2, ensure_ascii=False)
-            print(f"💾 Settings saved to {self.settings_file}")
+    def save_snapshot(self):
+        """Write the visible spread to the snapshot file for an instant start next time"""
+        # Before the book is shown the pages still hold the snapshot or the previous book
+        if not self.chapters or not self.current_book_path or not self.book_shown:
+            return
+        try:
+            size, mtime = self.book_cache.fingerprint(self.current_book_path)
+            snapshot = {
+                "path": self.current_book_path,
+                "size": size,
+                "mtime": mtime,
+                "title": self.book_title,
+                "author": self.book_author,
+                "chapter": self.current_chapter,
+                "chapter_title": self.chapters[self.current_chapter]['title'],
+                "offset": self.current_offset,
+                "first_page": self.current_page == 0,
+                "left_text": self.left_text.get("content_start", "end-1c"),
+                "right_text": self.right_text.get("1.0", "end-1c")
+            }
+            tmp_path = self.snapshot_file + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, self.snapshot_file)
         except Exception as e:
-            print(f"❌ Error saving settings: {e}")
-            messagebox.showerror("Settings Error", f"Failed to save settings: {e}")
-            
+            print(f"❌ Error saving snapshot: {e}")
+        
+    @tracer.timed("show_snapshot")
+    def show_snapshot(self):
+        """Paint the spread saved on exit if it belongs to the book about to be restored"""
+        try:
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            path = snapshot["path"]
+            if (path != self.settings.get("last_book_path") or snapshot["chapter"] != self.settings.get("last_chapter")
+                    or list(self.book_cache.fingerprint(path)) != [snapshot["size"], snapshot["mtime"]]):
+                return
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"❌ Ignoring snapshot {self.snapshot_file}: {e}")
+            return
+        
+        self.snapshot = snapshot
+        self.book_author = snapshot["author"]
+        self.title_label.config(text=snapshot["title"])
+        self.author_label.config(text=f"by {snapshot['author']}")
+        left_text, right_text = snapshot["left_text"], snapshot["right_text"]
+        self.load_content_to_pages(left_text + right_text, snapshot["chapter_title"],
+                                   (0, len(left_text)), (len(left_text), len(left_text) + len(right_text)),
+                                   snapshot["first_page"])
+        self.status_bar.config(text=f"Opening {snapshot['title']}...")
+        
     def auto_load_last_book(self):
         """Automatically load the last opened book and position"""
         last_book_path = self.settings.get("last_book_path", "")
@@ -141,22 +279,30 @@ class EpubReader:
                 print(f"📖 Auto-loading last book: {last_book_path}")
                 self.status_bar.config(text="Loading last book...")
                 
-                # Load the book
-                self.load_epub(last_book_path)
+                # Load the book directly at the saved chapter and character offset
+                loaded = self.load_epub(last_book_path, start_chapter=last_chapter,
+                                        start_offset=self.settings["last_offset"])
                 
-                # After book loads, restore the chapter position
-                def restore_position():
-                    if self.chapters and 0 <= last_chapter < len(self.chapters):
-                        self.current_chapter = last_chapter
-                        self.load_chapter(last_chapter)
-                        self.status_bar.config(text=f"Restored to chapter {last_chapter + 1}: {self.chapters[last_chapter]['title']}")
-                        print(f"✅ Restored to chapter {last_chapter + 1}")
+                # Runs on the Tk thread as soon as the chapter is on screen, unless another book is opened first
+                def restore_position(future):
+                    if future.cancelled():
+                        return
+                    if future.exception() is not None:
+                        self.status_bar.config(text="Failed to load last book")
+                        return
+                    now = time.perf_counter()
+                    if tracer.enabled:
+                        tracer.record("startup_to_last_page", STARTUP_TIME, now)
+                    latency_ms = (now - STARTUP_TIME) * 1000
+                    if future.result() == last_chapter:
+                        self.status_bar.config(text=f"Restored to chapter {last_chapter + 1}: {self.chapters[last_chapter]['title']} "
+                                                    f"({latency_ms:.0f} ms after startup)")
+                        print(f"✅ Restored to chapter {last_chapter + 1} {latency_ms:.0f} ms after startup")
                     else:
                         self.status_bar.config(text="Book loaded, starting from beginning")
                         print("📖 Starting from beginning (invalid chapter position)")
                 
-                # Wait a bit for the book to load, then restore position
-                self.root.after(1000, restore_position)
+                loaded.add_done_callback(restore_position)
                 
             except Exception as e:
                 print(f"❌ Error auto-loading last book: {e}")
@@ -197,6 +343,8 @@ class EpubReader:
         file_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="File", menu=file_menu)
         file_menu.add_command(label="Open EPUB", command=self.open_epub, accelerator="Ctrl+O")
+        file_menu.add_command(label="Library...", command=self.show_library, accelerator="Ctrl+L")
+        file_menu.add_command(label="Library Search...", command=self.show_library_search, accelerator="Ctrl+Shift+F")
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.on_exit)
         
@@ -213,22 +361,34 @@ class EpubReader:
         # Navigation menu
         nav_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Navigation", menu=nav_menu)
+        nav_menu.add_command(label="Previous Page", command=self.previous_page, accelerator="Left")
+        nav_menu.add_command(label="Next Page", command=self.next_page, accelerator="Right")
         nav_menu.add_command(label="Previous Chapter", command=self.previous_chapter, accelerator="Ctrl+Left")
         nav_menu.add_command(label="Next Chapter", command=self.next_chapter, accelerator="Ctrl+Right")
         nav_menu.add_command(label="Table of Contents", command=self.show_toc)
+        nav_menu.add_command(label="Go to Position...", command=self.go_to_percent)
+        nav_menu.add_command(label="Highlights && Notes...", command=self.show_highlights)
+        nav_menu.add_separator()
+        nav_menu.add_command(label="Search in Book...", command=self.search_text, accelerator="Ctrl+F")
         
         # Settings menu
         settings_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Settings", menu=settings_menu)
-        settings_menu.add_command(label="Save Settings", command=self.save_settings)
+        settings_menu.add_command(label="Save Settings", command=self.save_settings_now)
         settings_menu.add_separator()
         settings_menu.add_command(label="Toggle Auto-load Last Book", command=self.toggle_auto_load)
+        settings_menu.add_command(label="Toggle Parallel Extraction", command=self.toggle_parallel_extraction)
+        settings_menu.add_command(label="Toggle Fast Text Extraction (lxml)", command=self.toggle_extraction_backend)
         settings_menu.add_command(label="Show Reading Session", command=self.show_reading_session)
+        settings_menu.add_command(label="Clear Book Cache", command=self.clear_book_cache)
+        settings_menu.add_command(label="Add Dictionary Folder...", command=self.add_dictionary_folder)
         settings_menu.add_command(label="Reset to Defaults", command=self.reset_settings)
         
         # Help menu
         help_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Help", menu=help_menu)
+        help_menu.add_command(label="Performance Diagnostics", command=self.show_diagnostics)
+        help_menu.add_separator()
         help_menu.add_command(label="About", command=self.show_about)
         
         # Bind keyboard shortcuts
@@ -236,8 +396,15 @@ class EpubReader:
         self.root.bind('<Control-plus>', lambda e: self.increase_font_size())
         self.root.bind('<Control-minus>', lambda e: self.decrease_font_size())
         self.root.bind('<Control-d>', lambda e: self.toggle_dark_mode())
+        self.root.bind('<Left>', lambda e: self.previous_page())
+        self.root.bind('<Right>', lambda e: self.next_page())
+        self.root.bind('<Prior>', lambda e: self.previous_page())
+        self.root.bind('<Next>', lambda e: self.next_page())
         self.root.bind('<Control-Left>', lambda e: self.previous_chapter())
         self.root.bind('<Control-Right>', lambda e: self.next_chapter())
+        self.root.bind('<Control-f>', lambda e: self.search_text())
+        self.root.bind('<Control-F>', lambda e: self.show_library_search())
+        self.root.bind('<Control-l>', lambda e: self.show_library())
         
     def create_toolbar(self, parent):
         toolbar = ttk.Frame(parent)
@@ -296,18 +463,16 @@ class EpubReader:
         nav_frame = ttk.LabelFrame(sidebar_frame, text="Chapters", padding=10)
         nav_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        # Chapter listbox with scrollbar
-        list_frame = ttk.Frame(nav_frame)
-        list_frame.pack(fill=tk.BOTH, expand=True)
-        
-        self.chapter_listbox = tk.Listbox(list_frame, font=("Arial", 10))
-        chapter_scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.chapter_listbox.yview)
-        self.chapter_listbox.configure(yscrollcommand=chapter_scrollbar.set)
-        
-        self.chapter_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        chapter_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        # Chapter list with type-to-filter; only the visible rows are real Listbox items
+        self.chapter_list = VirtualList(nav_frame, on_select=self.on_sidebar_select, font=("Arial", 10))
+        self.chapter_list.pack(fill=tk.BOTH, expand=True)
         
-        self.chapter_listbox.bind('<<ListboxSelect>>', self.on_chapter_select)
+        # Loading progress, only shown while a book is still being extracted
+        self.load_progress_frame = ttk.Frame(nav_frame)
+        self.load_progress = ttk.Progressbar(self.load_progress_frame, mode='determinate')
+        self.load_progress.pack(fill=tk.X)
+        self.load_progress_label = ttk.Label(self.load_progress_frame, text="", font=("Arial", 9))
+        self.load_progress_label.pack(anchor=tk.W)
         
     def create_reading_area(self, parent):
         # Reading area frame with book-like background
@@ -386,8 +551,12 @@ class EpubReader:
         self.left_text.bind('<Button-3>', self.on_right_click)
         self.right_text.bind('<Button-3>', self.on_right_click)
         
-        # Create context toolbar (initially hidden)
-        self.create_context_toolbar()
+        # Hovering over a highlight with a note shows the note
+        for widget in (self.left_text, self.right_text):
+            widget.tag_bind("note", "<Enter>", lambda event: self.show_note_at(event.widget, event.x, event.y))
+        
+        # The context toolbar is only built the first time text is selected
+        self.context_toolbar = None
         
     def create_status_bar(self):
         self.status_bar = ttk.Label(self.root, text="Ready", relief=tk.SUNKEN, anchor=tk.W)
@@ -402,126 +571,476 @@ class EpubReader:
         if file_path:
             self.load_epub(file_path)
             
-    def load_epub(self, file_path):
+    def load_epub(self, file_path, start_chapter=0, start_offset=0):
+        """Open a book in the background
+
+        Returns a Future that is completed on the Tk thread with the index of
+        the chapter shown once the book is on screen, or with the error.
+        """
+        loaded = Future()
         try:
             self.status_bar.config(text="Loading EPUB...")
             self.root.update()
             
+            # Supersede a load still in progress: it stops at its next check
+            # and whatever it still publishes is dropped
+            self.cancel_load()
+            self.load_generation += 1
+            generation = self.load_generation
+            cancel = self.load_cancel = threading.Event()
+            events = self.load_events
+            
+            # Store what was read of the previous book before switching
+            self.close_book()
+            closing = self.closing_thread
+            
+            # Until the new book's "opened" event arrives, the queue drain must not
+            # see any state of the previous book
+            self.chapters = []
+            self.chapter_ready = bytearray()
+            self.listed_chapters = 0
+            self.listed_entries = 0
+            self.book_shown = False
+            
             # Save the book path
             self.current_book_path = file_path
+            self.start_chapter = start_chapter
+            self.start_offset = start_offset
+            # Until the book is shown, the position it opens at is the one to remember
+            self.current_chapter = start_chapter
+            self.current_offset = start_offset
+            
+            # Load EPUB in a separate thread to avoid freezing; it reports progress
+            # through a queue that the Tk loop drains, so chapters appear as they are extracted
+            def publish(*event):
+                events.put((generation,) + event)
             
-            # Load EPUB in a separate thread to avoid freezing
             def load_thread():
+                chapters = None
+                opened = False
                 try:
-                    book = epub.read_epub(file_path)
-                    
-                    # Get book metadata
-                    title = book.get_metadata('DC', 'title')
-                    author = book.get_metadata('DC', 'creator')
-                    
-                    self.book_title = title[0][0] if title else "Unknown Title"
-                    self.book_author = author[0][0] if author else "Unknown Author"
-                    
-                    # Extract chapters
-                    self.chapters = []
-                    for item in book.get_items():
-                        if item.get_type() == ebooklib.ITEM_DOCUMENT:
-                            soup = BeautifulSoup(item.get_content(), 'html.parser')
-                            # Remove script and style elements
-                            for script in soup(["script", "style"]):
-                                script.decompose()
-                            
-                            # Get text content
-                            text = soup.get_text()
-                            # Clean up text
-                            lines = (line.strip() for line in text.splitlines())
-                            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-                            text = ' '.join(chunk for chunk in chunks if chunk)
-                            
-                            if text.strip():
-                                self.chapters.append({
-                                    'title': item.get_name() or f"Chapter {len(self.chapters) + 1}",
-                                    'content': text
-                                })
+                    # The extraction engine pulls in BeautifulSoup/lxml, so it is
+                    # imported here, off the UI thread, the first time a book opens
+                    from epub_engine import open_book
                     
-                    # Update UI in main thread
-                    self.root.after(0, self.update_ui_after_load)
+                    # The previous book may still be being written, possibly to this very entry
+                    if closing is not None:
+                        closing.join()
+                    with tracer.span("load_epub", path=os.path.basename(file_path)):
+                        # Only the OPF and spine are read here; chapter text follows below
+                        with tracer.span("book_cache.get"):
+                            cached = self.book_cache.get(file_path)
+                        if cancel.is_set():
+                            if cached:
+                                cached["store"].close()
+                            return
+                        with tracer.span("open_book", cached=bool(cached)):
+                            title, author, chapters = open_book(file_path, cached,
+                                                                self.settings.get("extraction_backend", "bs4"))
+                        if cached:
+                            print(f"⚡ Loaded from cache: {file_path}")
+                    if cancel.is_set():
+                        return
+                    publish("opened", title, author, chapters)
+                    opened = True
                     
-                    # Save settings after successful load
-                    self.root.after(0, self.save_settings)
+                    # Chapters in the book cache are ready at once; the rest are extracted
+                    # starting with the one to show, on a process pool in parallel mode
+                    ready = [i for i, chapter in enumerate(chapters) if chapter.is_loaded]
+                    if ready:
+                        publish("ready", ready)
+                    if self.settings.get("extraction_mode") == "parallel":
+                        workers = self.settings.get("extraction_workers", 0)
+                    else:
+                        workers = 1
+                    with tracer.span("extract_all", chapters=len(chapters)):
+                        # Closing the generator cancels extraction batches that have not started
+                        loader = chapters.iter_load(workers, first=start_chapter)
+                        try:
+                            for index in loader:
+                                if cancel.is_set():
+                                    return
+                                publish("ready", [index])
+                        finally:
+                            loader.close()
+                    if cancel.is_set():
+                        return
+                    # Locate table of contents anchors once; they are cached with the book
+                    chapters.resolve_anchors()
+                    if chapters.dirty:
+                        self.store_chapters(file_path, title, author, chapters)
+                    publish("done")
                     
                 except Exception as e:
-                    self.root.after(0, lambda: messagebox.showerror("Error", f"Failed to load EPUB: {str(e)}"))
-                    self.root.after(0, lambda: self.status_bar.config(text="Error loading EPUB"))
+                    publish("error", e)
+                finally:
+                    # A superseded load frees a book it never handed over; once published,
+                    # the book is closed by close_book or by the queue drain
+                    if cancel.is_set():
+                        print(f"⏹️ Cancelled loading {file_path}")
+                        if chapters is not None and not opened:
+                            chapters.close()
             
-            threading.Thread(target=load_thread, daemon=True).start()
+            thread = threading.Thread(target=load_thread, daemon=True)
+            self.book_threads.append(thread)
+            thread.start()
+            self.root.after(0, self.drain_load_queue, generation, loaded)
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to open EPUB: {str(e)}")
             self.status_bar.config(text="Error opening EPUB")
+            loaded.set_exception(e)
+        return loaded
+        
+    def cancel_load(self):
+        """Ask the load in progress, if any, to stop"""
+        if self.load_cancel is not None:
+            self.load_cancel.set()
+            self.load_cancel = None
+        
+    def drain_load_queue(self, generation, loaded):
+        """Apply the load thread's progress on the Tk thread, polling until the book is loaded"""
+        if generation != self.load_generation:
+            if not loaded.done():
+                loaded.cancel()
+            return
+        
+        done = False
+        try:
+            while True:
+                event_generation, kind, *args = self.load_events.get_nowait()
+                if event_generation != generation:
+                    # Left over from a superseded load; release a book it managed to open
+                    if kind == "opened":
+                        args[2].close()
+                    continue
+                if kind == "opened":
+                    self.book_title, self.book_author, self.chapters = args
+                    self.on_book_opened()
+                elif kind == "ready":
+                    for index in args[0]:
+                        self.chapter_ready[index] = 1
+                elif kind == "done":
+                    done = True
+                elif kind == "error":
+                    error = args[0]
+                    self.load_cancel = None
+                    self.load_progress_frame.pack_forget()
+                    messagebox.showerror("Error", f"Failed to load EPUB: {error}")
+                    self.status_bar.config(text="Error loading EPUB")
+                    if not loaded.done():
+                        loaded.set_exception(error)
+                    return
+        except queue.Empty:
+            pass
+        
+        if self.chapter_ready:
+            self.show_load_progress()
+            # Show the book as soon as the chapter to open at is ready
+            if not self.book_shown and self.chapter_ready[self.start_chapter]:
+                self.update_ui_after_load(loaded)
+        
+        if done:
+            self.load_cancel = None
+            self.load_progress_frame.pack_forget()
+            if not self.book_shown:
+                self.update_ui_after_load(loaded)
+            self.status_bar.config(text=f"Loaded: {self.book_title}")
             
-    def update_ui_after_load(self):
-        # Update book info
+            # Prepare whole-book search without blocking reading
+            self.start_search_index()
+        else:
+            self.root.after(50, self.drain_load_queue, generation, loaded)
+            
+    def on_book_opened(self):
+        """Show a newly opened book's details and reset the chapter list for it to grow into"""
         self.title_label.config(text=self.book_title)
         self.author_label.config(text=f"by {self.book_author}")
+        self.chapter_list.clear()
+        self.positions = None
+        self.forget_images()
+        self.highlights = HighlightStore(HighlightStore.path_for(self.current_book_path))
+        self.chapter_ready = bytearray(len(self.chapters))
+        self.listed_chapters = 0
+        self.listed_entries = 0
+        self.book_shown = False
+        if not 0 <= self.start_chapter < len(self.chapters):
+            self.start_chapter, self.start_offset = 0, 0
+            self.current_chapter, self.current_offset = 0, 0
+        
+        self.load_progress.config(maximum=max(1, len(self.chapters)), value=0)
+        self.load_progress_label.config(text="")
+        self.load_progress_frame.pack(fill=tk.X, pady=(5, 0))
+        
+    def show_load_progress(self):
+        """Grow the chapter list over the chapters extracted so far and update the progress bar"""
+        # The list grows in reading order, so it only extends over the ready prefix
+        listed = self.listed_chapters
+        end = listed
+        while end < len(self.chapters) and self.chapter_ready[end]:
+            end += 1
+        if end > listed:
+            nav = self.nav_index()
+            if nav:
+                # Table of contents entries are listed once the chapter they point into is ready
+                first = last = self.listed_entries
+                while last < len(nav) and nav.entries[last]['chapter'] < end:
+                    last += 1
+                self.chapter_list.append(nav.titles(first, last))
+                self.listed_entries = last
+            else:
+                self.chapter_list.append([self.chapters[i]['title'] for i in range(listed, end)])
+            self.listed_chapters = end
         
-        # Update chapter list
-        self.chapter_listbox.delete(0, tk.END)
-        for i, chapter in enumerate(self.chapters):
-            self.chapter_listbox.insert(tk.END, chapter['title'])
+        ready = self.chapter_ready.count(1)
+        self.load_progress.config(value=ready)
+        self.load_progress_label.config(text=f"{ready} of {len(self.chapters)} chapters loaded")
+            
+    @tracer.timed("close_book")
+    def close_book(self):
+        """Release the open book, writing newly extracted chapters to the book cache in the background
+
+        The load must be cancelled first. The write waits for the book's load
+        and index threads to stop, since they may still be extracting or
+        storing the same chapters.
+        """
+        if self.highlights is not None:
+            self.highlights.close()
+            self.highlights = None
+        
+        chapters = self.chapters
+        threads, self.book_threads = self.book_threads, []
+        if not hasattr(chapters, 'to_cache'):
+            return
+        # A search index still being built for this book stops at its next check
+        self.chapters = []
+        file_path, title, author = self.current_book_path, self.book_title, self.book_author
         
-        # Load first chapter
+        def close_thread():
+            for thread in threads:
+                thread.join()
+            try:
+                if chapters.dirty and file_path:
+                    store = self.book_cache.put(file_path, title, author, chapters.to_cache(),
+                                                chapters.nav.to_json())
+                    if store is not None:
+                        store.close()
+                    chapters.dirty = False
+            except Exception as e:
+                print(f"❌ Error caching {file_path}: {e}")
+            finally:
+                chapters.close()
+        
+        # Not a daemon, so a write started on exit is finished before the process ends
+        self.closing_thread = threading.Thread(target=close_thread)
+        self.closing_thread.start()
+        
+    def store_chapters(self, file_path, title, author, chapters):
+        """Move extracted chapter text out of memory into the book cache's memory-mapped store"""
+        with tracer.span("store_chapters", chapters=len(chapters)):
+            store = self.book_cache.put(file_path, title, author, chapters.to_cache(), chapters.nav.to_json())
+            if store is not None:
+                chapters.use_store(store)
+        
+    @tracer.timed("update_ui_after_load")
+    def update_ui_after_load(self, loaded=None):
+        """Show the book at the requested chapter once that chapter's text is ready"""
+        self.book_shown = True
         if self.chapters:
-            self.current_chapter = 0
-            self.load_chapter(0)
+            self.current_chapter = self.start_chapter
+            self.load_chapter(self.start_chapter, self.start_offset)
+            self.snapshot = None
         
         self.status_bar.config(text=f"Loaded: {self.book_title}")
         
-    def load_chapter(self, chapter_index):
-        """Load a specific chapter"""
+        if loaded is not None and not loaded.done():
+            loaded.set_result(self.current_chapter)
+        
+    def start_search_index(self):
+        """Load or build the current book's search index in the background"""
+        self.search_index = None
+        if not self.settings.get("search_index_enabled", True) or not self.chapters:
+            return
+        
+        chapters = self.chapters
+        file_path = self.current_book_path
+        title, author = self.book_title, self.book_author
+        
+        def index_thread():
+            try:
+                with tracer.span("search_index", chapters=len(chapters)):
+                    # Snippets need every chapter's text; once extracted it moves to the book cache
+                    chapters.load_all(self.settings.get("extraction_workers", 0))
+                    if chapters.dirty:
+                        self.store_chapters(file_path, title, author, chapters)
+                    
+                    index_path = self.book_cache.sidecar_path(file_path, ".idx")
+                    fingerprint = self.book_cache.fingerprint(file_path)
+                    # Offsets depend on how the text was extracted, not only on the book
+                    source = {"cache_version": CACHE_VERSION, "backend": chapters.backend}
+                    index = SearchIndex.load(index_path, fingerprint, source)
+                    if index is None:
+                        index = SearchIndex.build((chapter['content'] for chapter in chapters),
+                                                  cancelled=lambda: self.chapters is not chapters)
+                        if index is None:
+                            return
+                        os.makedirs(self.book_cache.cache_dir, exist_ok=True)
+                        index.save(index_path, fingerprint, source)
+                        self.book_cache.evict(keep=file_path)
+                
+                self.root.after(0, lambda: self.on_search_index_ready(chapters, index))
+            except Exception as e:
+                print(f"❌ Error building search index: {e}")
+        
+        thread = threading.Thread(target=index_thread, daemon=True)
+        self.book_threads.append(thread)
+        thread.start()
+        
+    def on_search_index_ready(self, chapters, index):
+        """Publish a finished search index if its book is still open"""
+        if self.chapters is chapters:
+            self.search_index = index
+            print(f"🔍 Search index ready ({index.total_tokens} words)")
+        
+    @tracer.timed("load_chapter")
+    def load_chapter(self, chapter_index, offset=0):
+        """Load a specific chapter at the spread containing a character offset"""
         if 0 <= chapter_index < len(self.chapters):
             self.current_chapter = chapter_index
             
-            # Update listbox selection
-            self.chapter_listbox.selection_clear(0, tk.END)
-            self.chapter_listbox.selection_set(chapter_index)
-            self.chapter_listbox.see(chapter_index)
-            
             # Load content into two-page layout
-            chapter = self.chapters[chapter_index]
-            self.load_content_to_pages(chapter['content'], chapter['title'])
-            
-            # Update status and progress
-            auto_save_status = " | Auto-saved" if self.settings.get("auto_load_last_book", True) else ""
-            self.status_bar.config(text=f"Chapter {chapter_index + 1} of {len(self.chapters)}: {chapter['title']} | Right-click to go to next page{auto_save_status}")
-            self.update_progress()
+            self.current_page = self.spread_at(self.get_layout(chapter_index), offset)
+            self.show_spread()
             
             # Save current position
             self.save_settings()
+            
+    def nav_index(self):
+        """Return the current book's table of contents, or None if it has none"""
+        nav = getattr(self.chapters, 'nav', None)
+        return nav if nav else None
+        
+    def sidebar_position(self):
+        """Return the row of the chapter list that holds the current reading position"""
+        nav = self.nav_index()
+        if nav:
+            return nav.entry_at(self.current_chapter, self.current_offset)
+        return self.current_chapter
+        
+    def on_sidebar_select(self, index):
+        """Open a row of the chapter list or TOC: a contents entry if the book has them, else a chapter"""
+        if self.nav_index():
+            # Every entry already knows its chapter and offset, so this is a direct jump
+            chapter_index, offset = self.chapters.locate(index)
+            self.load_chapter(chapter_index, offset)
+        else:
+            self.load_chapter(index)
+            
+    def page_geometry(self):
+        """Return the width and height in pixels available for text on one page"""
+        frame_bd = int(self.left_page.cget('bd'))
+        text_bd = int(self.left_text.cget('bd')) + int(self.left_text.cget('highlightthickness'))
+        width = int(self.left_page.cget('width')) - 2 * (frame_bd + text_bd + int(self.left_text.cget('padx')))
+        height = int(self.left_page.cget('height')) - 2 * (frame_bd + text_bd + int(self.left_text.cget('pady')))
+        return width, height
+        
+    def get_font_metrics(self, size, weight="normal"):
+        """Return cached metrics for the current font family at a size"""
+        key = (self.font_family, size, weight)
+        metrics = self.font_metrics.get(key)
+        if metrics is None:
+            font = tkfont.Font(root=self.root, family=self.font_family, size=size, weight=weight)
+            metrics = self.font_metrics[key] = FontMetrics(font.measure, font.metrics("linespace"))
+        return metrics
+        
+    def first_page_lines(self, title, width, height):
+        """Return how many text lines fit on a chapter's first page below the author and title"""
+        heading_height = 0
+        for heading, size in ((self.book_author, self.font_size + 4), (title, self.font_size + 2)):
+            metrics = self.get_font_metrics(size, "bold")
+            lines = max(1, -(-metrics.width(heading) // width))
+            # Each heading is followed by an empty line in the same font
+            heading_height += metrics.line_height * (lines + 1)
+        return (height - heading_height) // self.get_font_metrics(self.font_size).line_height
+        
+    def get_layout(self, chapter_index):
+        """Return the page layout of a chapter for the current font and page size"""
+        width, height = self.page_geometry()
+        key = (self.current_book_path, chapter_index, self.font_family, self.font_size, width, height)
+        layout = self.page_cache.get(key)
+        if layout is None:
+            chapter = self.chapters[chapter_index]
+            paginator = Paginator(self.get_font_metrics(self.font_size), width, height)
+            layout = PageLayout(paginator, chapter['content'], self.first_page_lines(chapter['title'], width, height))
+            self.page_cache.put(key, layout)
+        return layout
+        
+    def spread_at(self, layout, offset):
+        """Return the left page of the spread containing a character offset"""
+        with tracer.span("paginate", offset=offset):
+            page = layout.page_at(offset)
+        return page - page % 2
+        
+    def show_spread(self):
+        """Display the current spread of the current chapter"""
+        chapter = self.chapters[self.current_chapter]
+        layout = self.get_layout(self.current_chapter)
+        with tracer.span("paginate", page=self.current_page):
+            left = layout.bounds(self.current_page)
+            right = (left[1], left[1])
+            if layout.has_page(self.current_page + 1):
+                right = layout.bounds(self.current_page + 1)
+        self.current_offset = left[0]
+        self.spread = (left, right)
+        self.spread_shown_at = time.monotonic()
+        self.load_content_to_pages(chapter['content'], chapter['title'], left, right, self.current_page == 0)
+        self.show_page_images(chapter, layout)
+        self.apply_highlights()
+        
+        # Highlight the chapter or contents entry being read; while loading, it may not be listed yet
+        self.chapter_list.select(self.sidebar_position())
+        
+        # Update status and progress; the page count is only known once the chapter is laid out to its end
+        if right[1] > right[0]:
+            pages = f"Pages {self.current_page + 1}-{self.current_page + 2}"
+        else:
+            pages = f"Page {self.current_page + 1}"
+        if layout.complete:
+            pages += f" of {layout.page_count()}"
+        auto_save_status = " | Auto-saved" if self.settings.get("auto_load_last_book", True) else ""
+        self.status_bar.config(text=f"Chapter {self.current_chapter + 1} of {len(self.chapters)}: {chapter['title']} | "
+                                    f"{pages} | Right-click to go to next page{auto_save_status}")
+        self.update_progress()
+        
+    def reflow(self):
+        """Re-paginate after a font change, keeping the reading position"""
+        if self.chapters:
+            self.current_page = self.spread_at(self.get_layout(self.current_chapter), self.current_offset)
+            self.show_spread()
         
-    def load_content_to_pages(self, content, title):
-        """Load content into the two-page layout"""
+    @tracer.timed("load_content_to_pages")
+    def load_content_to_pages(self, content, title, left, right, first_page):
+        """Load one spread into the two-page layout
+
+        left and right are (start, end) offsets into content; only those
+        slices are inserted, so the cost does not depend on the chapter size.
+        """
         # Clear both pages
         self.left_text.config(state=tk.NORMAL)
         self.right_text.config(state=tk.NORMAL)
         self.left_text.delete(1.0, tk.END)
         self.right_text.delete(1.0, tk.END)
         
-        # Add title to left page
-        self.left_text.insert(tk.END, f"{self.book_author}\n\n", "title")
-        self.left_text.insert(tk.END, f"{title}\n\n", "subtitle")
-        
-        # Split content between pages
-        words = content.split()
-        mid_point = len(words) // 2
-        
-        # Left page content
-        left_content = " ".join(words[:mid_point])
-        self.left_text.insert(tk.END, left_content)
+        # Add title to the first page of the chapter
+        if first_page:
+            self.left_text.insert(tk.END, f"{self.book_author}\n\n", "title")
+            self.left_text.insert(tk.END, f"{title}\n\n", "subtitle")
+        self.left_text.mark_set("content_start", "end-1c")
+        self.left_text.mark_gravity("content_start", tk.LEFT)
         
-        # Right page content
-        right_content = " ".join(words[mid_point:])
-        self.right_text.insert(tk.END, right_content)
+        with tracer.span("text_insert", chars=right[1] - left[0]):
+            self.left_text.insert(tk.END, content[left[0]:left[1]])
+            self.right_text.insert(tk.END, content[right[0]:right[1]])
         
         # Configure tags for styling
         self.left_text.tag_configure("title", font=(self.font_family, self.font_size + 4, "bold"), 
@@ -534,20 +1053,224 @@ class EpubReader:
         self.right_text.tag_configure("subtitle", font=(self.font_family, self.font_size + 2, "bold"), 
                                      foreground=self.text_color, justify=tk.CENTER)
         
+        for widget in (self.left_text, self.right_text):
+            widget.tag_configure("search_hit", background="#ffd54f", foreground="#000000")
+            widget.tag_configure("note", underline=True)
+            widget.tag_configure("image", justify=tk.CENTER)
+        
         # Disable editing
         self.left_text.config(state=tk.DISABLED)
         self.right_text.config(state=tk.DISABLED)
         
+    def image_box(self, layout, page):
+        """Return the largest (width, height) an image may have on a page of a layout"""
+        paginator = layout.paginator
+        lines = paginator.lines_per_page
+        if page == 0 and layout.first_page_lines is not None:
+            lines = max(1, layout.first_page_lines)
+        return paginator.width, lines * paginator.metrics.line_height
+        
+    def get_image_loader(self):
+        """Start the image decoding thread on first use"""
+        if self.image_loader is None:
+            from page_images import ImageLoader, ImageCache
+            self.image_cache = ImageCache(self.settings.get("image_cache_mb", 64) * 1024 * 1024)
+            self.image_loader = ImageLoader(lambda key, image: self.root.after(0, self.on_image_decoded, key, image))
+        return self.image_loader
+        
+    def show_page_images(self, chapter, layout):
+        """Put the images of the visible spread in place of their marks and prefetch the next spread's"""
+        self.page_photos = []
+        self.pending_images = {}
+        if not hasattr(chapter, 'images_between') or not chapter.images:
+            return
+        
+        for page, (widget, (start, end), origin) in enumerate(self.page_ranges(), self.current_page):
+            images = chapter.images_between(start, end)
+            if not images:
+                continue
+            loader = self.get_image_loader()
+            widget.config(state=tk.NORMAL)
+            for offset, member in images:
+                key = (self.current_book_path, member) + self.image_box(layout, page)
+                photo = self.image_cache.get(key)
+                if photo is None:
+                    if self.image_placeholder is None:
+                        self.image_placeholder = tk.PhotoImage(width=1, height=1)
+                    if key not in self.broken_images:
+                        loader.request(key)
+                else:
+                    self.page_photos.append(photo)
+                # The image takes the place of its mark, so offsets on the page do not change
+                index = widget.index(f"{origin}+{offset - start} indices")
+                widget.delete(index)
+                name = widget.image_create(index, image=photo or self.image_placeholder)
+                widget.tag_add("image", index)
+                if photo is None:
+                    self.pending_images.setdefault(key, []).append((widget, name))
+            widget.config(state=tk.DISABLED)
+        
+        # Decode the next spread's images while this one is read
+        for page in (self.current_page + 2, self.current_page + 3):
+            if not layout.has_page(page):
+                break
+            for offset, member in chapter.images_between(*layout.bounds(page)):
+                loader = self.get_image_loader()
+                key = (self.current_book_path, member) + self.image_box(layout, page)
+                if self.image_cache.get(key) is None and key not in self.broken_images:
+                    loader.request(key, urgent=False)
+        
+    def on_image_decoded(self, key, image):
+        """Cache a decoded image and show it if its page is still on screen"""
+        if key[0] != self.current_book_path:
+            return
+        if image is None:
+            self.broken_images.add(key)
+            return
+        from PIL import ImageTk
+        photo = ImageTk.PhotoImage(image)
+        self.image_cache.put(key, photo, image.width * image.height * 4)
+        for widget, name in self.pending_images.pop(key, []):
+            widget.image_configure(name, image=photo)
+            self.page_photos.append(photo)
+        
+    def forget_images(self):
+        """Drop the images of the previous book"""
+        self.page_photos = []
+        self.pending_images = {}
+        self.broken_images = set()
+        if self.image_loader is not None:
+            self.image_loader.cancel()
+            self.image_cache.clear()
+        
+    def page_ranges(self):
+        """Yield (widget, (start, end), index of start) for both pages of the current spread"""
+        left, right = self.spread
+        yield self.left_text, left, "content_start"
+        yield self.right_text, right, "1.0"
+        
+    def apply_highlights(self):
+        """Tag the highlights overlapping the visible spread, one batch per page and color"""
+        if not self.highlights:
+            return
+        with tracer.span("apply_highlights"):
+            for widget, (start, end), origin in self.page_ranges():
+                ranges = {}
+                notes = []
+                for highlight in self.highlights.overlapping(self.current_chapter, start, end):
+                    first = f"{origin}+{max(highlight['start'], start) - start} indices"
+                    last = f"{origin}+{min(highlight['end'], end) - start} indices"
+                    ranges.setdefault(highlight['color'], []).extend((first, last))
+                    if highlight['note']:
+                        notes.extend((first, last))
+                for color, indices in ranges.items():
+                    tag = f"highlight_{color.lstrip('#')}"
+                    widget.tag_configure(tag, background=color, foreground="#000000")
+                    widget.tag_add(tag, *indices)
+                if notes:
+                    widget.tag_add("note", *notes)
+                widget.tag_raise("sel")
+                
+    def text_offset(self, widget, origin, index):
+        """Return how many characters lie between two indices of a page widget
+
+        An image counts as one character, like the mark it replaced.
+        """
+        if widget.compare(index, "<=", origin):
+            return 0
+        count = widget.count(origin, index, "indices")
+        if isinstance(count, tuple):
+            count = count[0]
+        return count or 0
+        
+    def selection_offsets(self):
+        """Return the (start, end) chapter offsets of the text selected on the spread, or None"""
+        for widget, (start, end), origin in self.page_ranges():
+            try:
+                first, last = widget.index(tk.SEL_FIRST), widget.index(tk.SEL_LAST)
+            except tk.TclError:
+                continue
+            first = min(end, start + self.text_offset(widget, origin, first))
+            last = min(end, start + self.text_offset(widget, origin, last))
+            if last > first:
+                return first, last
+        return None
+        
+    def show_note_at(self, widget, x, y):
+        """Show the note of the highlight under the mouse in the status bar"""
+        for page, (start, end), origin in self.page_ranges():
+            if page is widget and self.highlights:
+                offset = start + self.text_offset(widget, origin, widget.index(f"@{x},{y}"))
+                for highlight in self.highlights.overlapping(self.current_chapter, offset, offset + 1):
+                    if highlight['note']:
+                        self.status_bar.config(text=f"📝 {highlight['note']}")
+                        return
+        
+    def book_positions(self):
+        """Return the open book's BookPositions, or None until every chapter length is known"""
+        if self.positions is None and self.chapters and hasattr(self.chapters, 'lengths'):
+            lengths = self.chapters.lengths()
+            if lengths is not None:
+                self.positions = BookPositions(lengths)
+        return self.positions
+        
     def update_progress(self):
         """Update the progress indicator"""
-        if self.chapters:
+        if not self.chapters:
+            return
+        positions = self.book_positions()
+        if positions is None:
+            # Chapter lengths are known once the whole book is extracted; until then count chapters
             progress = (self.current_chapter + 1) / len(self.chapters) * 100
             self.progress_label.config(text=f"location {self.current_chapter + 1} of {len(self.chapters)} ({progress:.0f}%)")
+            return
+        chapter_left, book_left = positions.remaining(self.current_chapter, self.current_offset)
+        progress = positions.fraction(self.current_chapter, self.current_offset) * 100
+        self.progress_label.config(text=f"{progress:.1f}% | {format_minutes(self.reading_speed.minutes(chapter_left))} left in chapter"
+                                        f" | {format_minutes(self.reading_speed.minutes(book_left))} left in book")
+        
+    def record_reading_speed(self):
+        """Learn the reading speed from how long the spread being left was on screen"""
+        if self.spread_shown_at is None:
+            return
+        left, right = self.spread
+        self.reading_speed.page_turned(right[1] - left[0], time.monotonic() - self.spread_shown_at)
+        self.spread_shown_at = None
+        
+    def go_to_percent(self):
+        """Jump to a percentage of the book"""
+        positions = self.book_positions()
+        if positions is None:
+            messagebox.showinfo("Go to Position", "The book is still loading.")
+            return
+        current = positions.fraction(self.current_chapter, self.current_offset) * 100
+        percent = simpledialog.askfloat("Go to Position", "Percentage of the book:", parent=self.root,
+                                        initialvalue=round(current, 1), minvalue=0, maxvalue=100)
+        if percent is None:
+            return
+        chapter, offset = positions.from_location(round(positions.total * percent / 100))
+        self.load_chapter(chapter, offset)
             
-    def on_chapter_select(self, event):
-        selection = self.chapter_listbox.curselection()
-        if selection:
-            self.load_chapter(selection[0])
+    def previous_page(self):
+        if not self.chapters:
+            return
+        if self.current_page > 0:
+            self.current_page -= 2
+            self.show_spread()
+        elif self.current_chapter > 0:
+            # Open the previous chapter at its last spread
+            chapter_index = self.current_chapter - 1
+            self.load_chapter(chapter_index, len(self.chapters[chapter_index]['content']))
+            
+    def next_page(self):
+        if not self.chapters:
+            return
+        self.record_reading_speed()
+        if self.get_layout(self.current_chapter).has_page(self.current_page + 2):
+            self.current_page += 2
+            self.show_spread()
+        else:
+            self.next_chapter()
             
     def previous_chapter(self):
         if self.current_chapter > 0:
@@ -588,6 +1311,9 @@ class EpubReader:
         self.right_text.tag_configure("title", font=(self.font_family, self.font_size + 4, "bold"))
         self.right_text.tag_configure("subtitle", font=(self.font_family, self.font_size + 2, "bold"))
         
+        # Page breaks depend on the font
+        self.reflow()
+        
     def update_colors(self):
         """Update text widget colors"""
         if not self.dark_mode:
@@ -657,7 +1383,7 @@ class EpubReader:
             )
             
             # Listbox dark theme
-            self.chapter_listbox.configure(
+            self.chapter_list.configure_rows(
                 bg='#1e1e1e',
                 fg='#ffffff',
                 selectbackground='#404040',
@@ -700,7 +1426,7 @@ class EpubReader:
             )
             
             # Listbox light theme
-            self.chapter_listbox.configure(
+            self.chapter_list.configure_rows(
                 bg='#ffffff',
                 fg='#000000',
                 selectbackground='#0078d4',
@@ -712,9 +1438,9 @@ class EpubReader:
     def on_mousewheel(self, event):
         # Handle mousewheel for page navigation
         if event.delta > 0:
-            self.previous_chapter()
+            self.previous_page()
         else:
-            self.next_chapter()
+            self.next_page()
         
     def show_toc(self):
         if not self.chapters:
@@ -727,25 +1453,18 @@ class EpubReader:
         toc_window.transient(self.root)
         toc_window.grab_set()
         
-        # Create listbox for TOC
-        listbox = tk.Listbox(toc_window, font=("Arial", 11))
-        scrollbar = ttk.Scrollbar(toc_window, orient=tk.VERTICAL, command=listbox.yview)
-        listbox.configure(yscrollcommand=scrollbar.set)
-        
-        listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y, pady=10)
-        
-        # Populate TOC
-        for i, chapter in enumerate(self.chapters):
-            listbox.insert(tk.END, f"{i+1}. {chapter['title']}")
+        def on_toc_select(index):
+            toc_window.destroy()
+            self.on_sidebar_select(index)
             
-        def on_toc_select(event):
-            selection = listbox.curselection()
-            if selection:
-                toc_window.destroy()
-                self.load_chapter(selection[0])
-                
-        listbox.bind('<Double-Button-1>', on_toc_select)
+        # Virtualized and filterable, so books with tens of thousands of entries open instantly
+        nav = self.nav_index()
+        toc_list = VirtualList(toc_window, on_select=on_toc_select, font=("Arial", 11),
+                               numbered=not nav, activate="double")
+        toc_list.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        toc_list.set_items(nav.titles() if nav else [chapter['title'] for chapter in self.chapters])
+        toc_list.select(self.sidebar_position())
+        toc_list.filter_entry.focus_set()
         
     def show_color_dialog(self):
         """Show color customization dialog"""
@@ -780,7 +1499,7 @@ class EpubReader:
         bg_color_var = tk.StringVar(value=self.bg_color)
         
         def choose_bg_color():
-            color = tk.colorchooser.askcolor(title="Choose Background Color", color=self.bg_color)
+            color = colorchooser.askcolor(title="Choose Background Color", color=self.bg_color)
             if color[1]:
                 bg_color_var.set(color[1])
                 bg_preview.configure(bg=color[1])
@@ -803,7 +1522,7 @@ class EpubReader:
         text_color_var = tk.StringVar(value=self.text_color)
         
         def choose_text_color():
-            color = tk.colorchooser.askcolor(title="Choose Text Color", color=self.text_color)
+            color = colorchooser.askcolor(title="Choose Text Color", color=self.text_color)
             if color[1]:
                 text_color_var.set(color[1])
                 text_preview.configure(fg=color[1])
@@ -875,7 +1594,13 @@ class EpubReader:
         
     def on_exit(self):
         """Handle application exit - save settings before closing"""
+        self.remember_window_layout()
         self.save_settings()
+        self.save_snapshot()
+        self.cancel_load()
+        self.close_book()
+        # Pending settings are written by a background thread; wait for them
+        self.settings_store.flush()
         self.root.quit()
         
     def reset_settings(self):
@@ -884,7 +1609,8 @@ class EpubReader:
                               "Are you sure you want to reset all settings to defaults?\n"
                               "This will restart the application."):
             try:
-                # Remove settings file
+                # Remove settings file, making sure no queued write brings it back
+                self.settings_store.discard()
                 if os.path.exists(self.settings_file):
                     os.remove(self.settings_file)
                     print(f"🗑️ Settings file removed: {self.settings_file}")
@@ -916,11 +1642,49 @@ class EpubReader:
                           f"Auto-load last book has been {status}.\n"
                           f"This setting will take effect the next time you restart the application.")
         
+    def toggle_parallel_extraction(self):
+        """Switch between lazy and parallel up-front chapter extraction"""
+        parallel = self.settings.get("extraction_mode") != "parallel"
+        self.settings["extraction_mode"] = "parallel" if parallel else "lazy"
+        self.save_settings()
+        
+        if parallel:
+            message = ("Parallel extraction has been enabled.\n"
+                       "Books will be fully extracted on all CPU cores when opened.")
+        else:
+            message = ("Parallel extraction has been disabled.\n"
+                       "Chapters will be extracted one at a time in the background.")
+        messagebox.showinfo("Extraction Mode", message)
+        
+    def toggle_extraction_backend(self):
+        """Switch between the BeautifulSoup and streaming lxml text extractors"""
+        use_lxml = self.settings.get("extraction_backend", "bs4") != "lxml"
+        self.settings["extraction_backend"] = "lxml" if use_lxml else "bs4"
+        self.save_settings()
+        
+        backend = "streaming lxml" if use_lxml else "BeautifulSoup"
+        messagebox.showinfo("Text Extraction",
+                          f"Chapters will now be extracted with the {backend} backend.\n"
+                          f"This applies to chapters that are not already cached.")
+        
+    def clear_book_cache(self):
+        """Remove all cached parsed books"""
+        self.book_cache.clear()
+        messagebox.showinfo("Book Cache", "The parsed book cache has been cleared.")
+        
     def show_reading_session(self):
         """Show current reading session information"""
         if self.current_book_path:
             book_name = os.path.basename(self.current_book_path)
             chapter_info = f"Chapter {self.current_chapter + 1} of {len(self.chapters)}" if self.chapters else "No chapters loaded"
+            positions = self.book_positions()
+            if positions is not None:
+                chapter_left, book_left = positions.remaining(self.current_chapter, self.current_offset)
+                chapter_info += (f", character {self.current_offset:,}"
+                                 f" ({positions.fraction(self.current_chapter, self.current_offset) * 100:.1f}%)\n"
+                                 f"Time left: {format_minutes(self.reading_speed.minutes(book_left))} in book, "
+                                 f"{format_minutes(self.reading_speed.minutes(chapter_left))} in chapter "
+                                 f"at {self.reading_speed.chars_per_minute:.0f} characters per minute")
             auto_load_status = "enabled" if self.settings.get("auto_load_last_book", True) else "disabled"
             
             info_text = f"""Current Reading Session:
@@ -950,6 +1714,7 @@ Auto-load is enabled and will remember your position."""
         # Toolbar buttons
         buttons = [
             ("🖍️", "Highlight", self.highlight_text),
+            ("📝", "Note", self.add_note),
             ("📘", "Facebook", self.share_facebook),
             ("🐦", "Twitter", self.share_twitter),
             ("📋", "Copy", self.copy_text),
@@ -994,8 +1759,8 @@ Auto-load is enabled and will remember your position."""
         # Hide any existing context toolbar
         self.hide_context_toolbar()
         
-        # Navigate to next chapter/page
-        self.next_chapter()
+        # Navigate to next page
+        self.next_page()
         
         # Prevent the default context menu
         return "break"
@@ -1010,16 +1775,109 @@ Auto-load is enabled and will remember your position."""
         toolbar_x = widget_x + x
         toolbar_y = widget_y + y + 20
         
+        if self.context_toolbar is None:
+            self.create_context_toolbar()
         self.context_toolbar.place(x=toolbar_x, y=toolbar_y)
         
     def hide_context_toolbar(self):
         """Hide the context toolbar"""
-        self.context_toolbar.place_forget()
+        if self.context_toolbar is not None:
+            self.context_toolbar.place_forget()
         
     def highlight_text(self):
-        """Highlight selected text"""
-        # This would implement text highlighting
-        messagebox.showinfo("Highlight", "Text highlighting feature coming soon!")
+        """Highlight the selected text, or remove the highlights it touches"""
+        self.hide_context_toolbar()
+        selection = self.selection_offsets()
+        if selection is None or self.highlights is None:
+            messagebox.showinfo("Highlight", "Select some text on the page first.")
+            return
+        
+        start, end = selection
+        existing = self.highlights.overlapping(self.current_chapter, start, end)
+        if existing:
+            for highlight in existing:
+                self.highlights.remove(highlight['id'])
+        else:
+            text = self.chapters[self.current_chapter]['content'][start:end]
+            self.highlights.add(self.current_chapter, start, end, text=text[:200])
+        self.show_spread()
+        
+    def add_note(self):
+        """Attach a note to the selected text, highlighting it if needed"""
+        self.hide_context_toolbar()
+        selection = self.selection_offsets()
+        if selection is None or self.highlights is None:
+            messagebox.showinfo("Note", "Select some text on the page first.")
+            return
+        
+        start, end = selection
+        existing = self.highlights.overlapping(self.current_chapter, start, end)
+        note = simpledialog.askstring("Note", "Note:", parent=self.root,
+                                      initialvalue=existing[0]['note'] if existing else "")
+        if note is None:
+            return
+        if existing:
+            self.highlights.set_note(existing[0]['id'], note)
+        else:
+            text = self.chapters[self.current_chapter]['content'][start:end]
+            self.highlights.add(self.current_chapter, start, end, text=text[:200], note=note)
+        self.show_spread()
+        
+    def show_highlights(self):
+        """List the book's highlights and notes; double-click one to go to it"""
+        if self.highlights is None:
+            messagebox.showinfo("Highlights & Notes", "No book loaded")
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("Highlights & Notes")
+        window.geometry("500x500")
+        window.transient(self.root)
+        
+        highlights = []
+        
+        def label(highlight):
+            chapter = highlight['chapter']
+            title = self.chapters[chapter]['title'] if chapter < len(self.chapters) else ""
+            text = f"{chapter + 1}. {title}: {' '.join(highlight['text'].split())[:80]}"
+            return f"{text} — 📝 {highlight['note']}" if highlight['note'] else text
+        
+        def refresh():
+            highlights[:] = self.highlights.all()
+            highlight_list.set_items([label(highlight) for highlight in highlights])
+            count_label.config(text=f"{len(highlights)} highlights")
+            
+        def go_to(index):
+            highlight = highlights[index]
+            self.load_chapter(highlight['chapter'], highlight['start'])
+            
+        def edit_note():
+            if highlight_list.selected is None:
+                return
+            highlight = highlights[highlight_list.selected]
+            note = simpledialog.askstring("Note", "Note:", parent=window, initialvalue=highlight['note'])
+            if note is not None:
+                self.highlights.set_note(highlight['id'], note)
+                refresh()
+                self.show_spread()
+                
+        def delete():
+            if highlight_list.selected is None:
+                return
+            self.highlights.remove(highlights[highlight_list.selected]['id'])
+            refresh()
+            self.show_spread()
+        
+        button_frame = ttk.Frame(window)
+        button_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=(0, 10))
+        ttk.Button(button_frame, text="Edit Note...", command=edit_note).pack(side=tk.LEFT)
+        ttk.Button(button_frame, text="Delete", command=delete).pack(side=tk.LEFT, padx=(5, 0))
+        count_label = ttk.Label(button_frame, text="")
+        count_label.pack(side=tk.RIGHT)
+        
+        highlight_list = VirtualList(window, on_select=go_to, activate="double")
+        highlight_list.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        refresh()
         
     def share_facebook(self):
         """Share selected text on Facebook"""
@@ -1042,18 +1900,569 @@ Auto-load is enabled and will remember your position."""
         except tk.TclError:
             messagebox.showinfo("Copy", "No text selected!")
         
+    def get_selected_text(self):
+        """Return the text selected on either page, or an empty string"""
+        for widget in (self.left_text, self.right_text):
+            try:
+                return widget.get(tk.SEL_FIRST, tk.SEL_LAST)
+            except tk.TclError:
+                continue
+        return ""
+        
     def search_text(self):
         """Search for text in the book"""
-        messagebox.showinfo("Search", "Search feature coming soon!")
+        self.hide_context_toolbar()
+        if not self.chapters:
+            messagebox.showinfo("Search", "No book loaded")
+            return
+        
+        query = self.get_selected_text().strip()
+        if self.search_window is not None and self.search_window.winfo_exists():
+            self.search_window.lift()
+            if query:
+                self.search_query_var.set(query)
+                self.run_search()
+            return
+        
+        self.search_window = tk.Toplevel(self.root)
+        self.search_window.title("Search in Book")
+        self.search_window.geometry("560x460")
+        self.search_window.transient(self.root)
+        
+        main_frame = ttk.Frame(self.search_window, padding=10)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Query entry
+        query_frame = ttk.Frame(main_frame)
+        query_frame.pack(fill=tk.X)
+        self.search_query_var = tk.StringVar(value=query)
+        query_entry = ttk.Entry(query_frame, textvariable=self.search_query_var)
+        query_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
+        query_entry.bind('<Return>', lambda e: self.run_search())
+        ttk.Button(query_frame, text="Search", command=self.run_search).pack(side=tk.LEFT)
+        
+        ttk.Label(main_frame, text='Use "quotes" for exact phrases', font=("Arial", 8)).pack(anchor=tk.W, pady=(2, 5))
+        
+        # Results list
+        list_frame = ttk.Frame(main_frame)
+        list_frame.pack(fill=tk.BOTH, expand=True)
+        self.search_results_listbox = tk.Listbox(list_frame, font=("Arial", 10))
+        results_scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.search_results_listbox.yview)
+        self.search_results_listbox.configure(yscrollcommand=results_scrollbar.set)
+        self.search_results_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        results_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.search_results_listbox.bind('<Double-Button-1>', self.on_search_result_select)
+        self.search_results_listbox.bind('<Return>', self.on_search_result_select)
+        
+        self.search_status_label = ttk.Label(main_frame, text="")
+        self.search_status_label.pack(anchor=tk.W, pady=(5, 0))
+        
+        self.search_hits = []
+        query_entry.focus_set()
+        if query:
+            self.run_search()
+        
+    def run_search(self):
+        """Query the search index and list the hits with snippets"""
+        query = self.search_query_var.get().strip()
+        self.search_results_listbox.delete(0, tk.END)
+        self.search_hits = []
+        if not query:
+            return
+        if self.search_index is None:
+            self.search_status_label.config(text="The search index is still being built, please try again shortly.")
+            return
+        
+        start = time.perf_counter()
+        with tracer.span("search", query=query):
+            hits = self.search_index.search(query)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.search_hits = hits
+        for hit in hits:
+            chapter = self.chapters[hit['chapter']]
+            snippet = make_snippet(chapter['content'], hit['offset'], hit['length'])
+            self.search_results_listbox.insert(tk.END, f"{hit['chapter'] + 1}. {chapter['title']}: {snippet}")
+        
+        self.search_status_label.config(text=f"{len(hits)} matches in {elapsed_ms:.1f} ms" if hits else "No matches found")
+        
+    def on_search_result_select(self, event):
+        """Jump to the chapter of the selected hit and highlight it"""
+        selection = self.search_results_listbox.curselection()
+        if selection:
+            hit = self.search_hits[selection[0]]
+            self.load_chapter(hit['chapter'], hit['offset'])
+            self.highlight_search_hit(hit['offset'], hit['length'])
+        
+    def highlight_search_hit(self, offset, length):
+        """Highlight a match given by its character offset in the current chapter"""
+        for widget in (self.left_text, self.right_text):
+            widget.tag_remove("search_hit", "1.0", tk.END)
+        
+        # Pages are exact slices of the chapter, so offsets map directly to text indices
+        layout = self.get_layout(self.current_chapter)
+        page = layout.page_at(offset)
+        if page == self.current_page:
+            widget, start = self.left_text, "content_start"
+        elif page == self.current_page + 1:
+            widget, start = self.right_text, "1.0"
+        else:
+            return
+        index = f"{start}+{offset - layout.pages[page]} indices"
+        widget.tag_add("search_hit", index, f"{index}+{length} indices")
+        
+    def get_dictionaries(self):
+        """Open the offline dictionaries on first use; safe to call from worker threads"""
+        with self.dictionary_lock:
+            if self.dictionaries is None:
+                from dictionary import Dictionaries
+                self.dictionaries = Dictionaries(self.settings.get("dictionary_folders", ["dictionaries"]),
+                                                 cache_dir=self.book_cache.cache_dir)
+            return self.dictionaries
         
     def get_definition(self):
-        """Get definition of selected word"""
-        messagebox.showinfo("Definition", "Dictionary lookup feature coming soon!")
+        """Look up the selected word in the offline dictionaries"""
+        self.hide_context_toolbar()
+        words = re.findall(r"\w[\w'’-]*", self.get_selected_text())
+        if not words:
+            messagebox.showinfo("Definition", "Select a word first.")
+            return
+        word = words[0].replace("’", "'").strip("'-")
+        
+        # The first lookup may index a dictionary, so it never runs on the Tk thread
+        def lookup_thread():
+            try:
+                dictionaries = self.get_dictionaries()
+                with tracer.span("dictionary_lookup", word=word):
+                    form, entries = dictionaries.lookup(word)
+                self.root.after(0, self.show_definition, word, form, entries, len(dictionaries.dictionaries))
+            except Exception as e:
+                print(f"❌ Error looking up {word}: {e}")
+                message = f"Dictionary lookup failed: {e}"
+                self.root.after(0, lambda: self.status_bar.config(text=message))
+        
+        self.status_bar.config(text=f"Looking up {word}...")
+        threading.Thread(target=lookup_thread, daemon=True).start()
+        
+    def show_definition(self, word, form, entries, dictionary_count):
+        """Show the definitions found for a word"""
+        window = tk.Toplevel(self.root)
+        window.title(f"Definition: {word}")
+        window.geometry("450x400")
+        window.transient(self.root)
+        
+        text = tk.Text(window, wrap=tk.WORD, font=("Arial", 11), padx=10, pady=10)
+        scrollbar = ttk.Scrollbar(window, orient=tk.VERTICAL, command=text.yview)
+        text.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        text.pack(fill=tk.BOTH, expand=True)
+        text.tag_configure("headword", font=("Arial", 14, "bold"))
+        text.tag_configure("source", font=("Arial", 9, "italic"), foreground="#666666")
+        
+        if entries:
+            text.insert(tk.END, form, "headword")
+            if form.lower() != word.lower():
+                text.insert(tk.END, f"  (from \"{word}\")", "source")
+            text.insert(tk.END, "\n")
+            for name, headword, definition in entries:
+                text.insert(tk.END, f"\n{name} — {headword}\n", "source")
+                text.insert(tk.END, f"{definition}\n")
+            self.status_bar.config(text=f"Definition of {form}")
+        elif not dictionary_count:
+            folders = ", ".join(self.settings.get("dictionary_folders", ["dictionaries"]))
+            text.insert(tk.END, "No dictionaries installed.\n\n", "headword")
+            text.insert(tk.END, f"Put StarDict dictionaries (.ifo, .idx and .dict or .dict.dz files) in {folders}, "
+                                f"or add a folder with Settings → Add Dictionary Folder.")
+            self.status_bar.config(text="No dictionaries installed")
+        else:
+            text.insert(tk.END, f"No definition found for \"{word}\".", "headword")
+            self.status_bar.config(text=f"No definition found for {word}")
+        text.config(state=tk.DISABLED)
+        
+    def add_dictionary_folder(self):
+        """Add a folder of StarDict dictionaries"""
+        folder = filedialog.askdirectory(title="Add Dictionary Folder")
+        if folder:
+            folders = self.settings.setdefault("dictionary_folders", ["dictionaries"])
+            if folder not in folders:
+                folders.append(folder)
+                self.save_settings()
+            # Reopened with the new folder on the next lookup
+            with self.dictionary_lock:
+                if self.dictionaries is not None:
+                    self.dictionaries.close()
+                self.dictionaries = None
         
     def share_text(self):
         """Share selected text"""
         messagebox.showinfo("Share", "General sharing feature coming soon!")
         
+    def get_library_index(self):
+        """Open the library database on first use"""
+        if self.library_index is None:
+            from library_index import LibraryIndex
+            self.library_index = LibraryIndex(self.settings.get("library_db", "epub_library.db"),
+                                              self.settings.get("cover_cache_dir", "epub_reader_covers"))
+        return self.library_index
+        
+    def show_library_search(self):
+        """Show the library-wide search window"""
+        if self.library_window is not None and self.library_window.winfo_exists():
+            self.library_window.lift()
+            return
+        
+        try:
+            library = self.get_library_index()
+        except Exception as e:
+            messagebox.showerror("Library Search", f"Failed to open the library index: {e}")
+            return
+        
+        self.library_window = tk.Toplevel(self.root)
+        self.library_window.title("Library Search")
+        self.library_window.geometry("700x500")
+        self.library_window.transient(self.root)
+        
+        main_frame = ttk.Frame(self.library_window, padding=10)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Indexed folders
+        folder_frame = ttk.LabelFrame(main_frame, text="Library", padding=10)
+        folder_frame.pack(fill=tk.X, pady=(0, 10))
+        self.library_status_label = ttk.Label(folder_frame, text="")
+        self.library_status_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        ttk.Button(folder_frame, text="Rescan", command=self.rescan_library).pack(side=tk.RIGHT, padx=(5, 0))
+        ttk.Button(folder_frame, text="Add Folder...", command=self.add_library_folder).pack(side=tk.RIGHT)
+        
+        # Query entry
+        query_frame = ttk.Frame(main_frame)
+        query_frame.pack(fill=tk.X)
+        query_var = tk.StringVar(value=self.get_selected_text().strip())
+        query_entry = ttk.Entry(query_frame, textvariable=query_var)
+        query_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
+        
+        # Results list
+        list_frame = ttk.Frame(main_frame)
+        list_frame.pack(fill=tk.BOTH, expand=True, pady=(10, 0))
+        results_listbox = tk.Listbox(list_frame, font=("Arial", 10))
+        results_scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=results_listbox.yview)
+        results_listbox.configure(yscrollcommand=results_scrollbar.set)
+        results_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        results_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        results_label = ttk.Label(main_frame, text="")
+        results_label.pack(anchor=tk.W, pady=(5, 0))
+        
+        hits = []
+        
+        def run_query():
+            query = query_var.get().strip()
+            results_listbox.delete(0, tk.END)
+            hits.clear()
+            if not query:
+                return
+            start = time.perf_counter()
+            try:
+                with tracer.span("library_search", query=query):
+                    hits.extend(library.search(query))
+            except Exception as e:
+                results_label.config(text=f"Search failed: {e}")
+                return
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            for hit in hits:
+                results_listbox.insert(tk.END, f"{hit['title']} — {hit['chapter'] + 1}. {hit['chapter_title']}: {hit['snippet']}")
+            results_label.config(text=f"{len(hits)} chapters in {elapsed_ms:.0f} ms" if hits else "No matches found")
+        
+        def open_hit(event):
+            selection = results_listbox.curselection()
+            if selection:
+                self.open_library_hit(hits[selection[0]])
+        
+        query_entry.bind('<Return>', lambda e: run_query())
+        ttk.Button(query_frame, text="Search", command=run_query).pack(side=tk.LEFT)
+        results_listbox.bind('<Double-Button-1>', open_hit)
+        results_listbox.bind('<Return>', open_hit)
+        
+        self.update_library_status()
+        query_entry.focus_set()
+        if query_var.get():
+            run_query()
+        
+    def update_library_status(self, text=None):
+        """Show the scan progress or the library size in the library windows"""
+        labels = [label for window, label in ((self.library_window, 'library_status_label'),
+                                               (self.catalog_window, 'catalog_status_label'))
+                  if window is not None and window.winfo_exists()]
+        if not labels:
+            return
+        if text is None:
+            books, searchable = self.get_library_index().book_count()
+            text = f"{books} books in {len(self.settings.get('library_folders', []))} folder(s)"
+            if searchable < books:
+                text += f", {searchable} searchable"
+        for label in labels:
+            getattr(self, label).config(text=text)
+        
+    def ask_library_folder(self):
+        """Ask for a folder to add to the library; returns it, or None if cancelled"""
+        folder = filedialog.askdirectory(title="Add Library Folder")
+        if folder:
+            folders = self.settings.setdefault("library_folders", [])
+            if folder not in folders:
+                folders.append(folder)
+                self.save_settings()
+        return folder or None
+        
+    def add_library_folder(self):
+        """Add a folder to the library and scan it"""
+        folder = self.ask_library_folder()
+        if folder:
+            self.rescan_library([folder])
+        
+    def rescan_library(self, folders=None):
+        """Catalog and index new and changed books in the background
+
+        The book list is refreshed as soon as the metadata is read, while
+        chapter text is still being extracted for search.
+        """
+        folders = folders or list(self.settings.get("library_folders", []))
+        if not folders:
+            messagebox.showinfo("Library", "Add a folder of EPUB files first.")
+            return
+        if self.library_scanning:
+            self.library_scan_queue.extend(folder for folder in folders if folder not in self.library_scan_queue)
+            return
+        self.library_scanning = True
+        
+        library = self.get_library_index()
+        
+        def progress(stage, done, total, path):
+            if stage == "catalog":
+                text = f"Reading {done} of {total} new or changed books..."
+            else:
+                text = f"Indexing {done} of {total}: {os.path.basename(path)}"
+            self.root.after(0, lambda: self.update_library_status(text))
+        
+        def cataloged():
+            self.root.after(0, self.refresh_catalog)
+        
+        def scan_thread():
+            totals = {"cataloged": 0, "indexed": 0, "unchanged": 0, "removed": 0, "failed": 0}
+            for folder in folders:
+                if not os.path.isdir(folder):
+                    continue
+                try:
+                    with tracer.span("library_scan", folder=folder):
+                        stats = library.scan(folder, workers=self.settings.get("extraction_workers", 0),
+                                             backend=self.settings.get("extraction_backend", "bs4"),
+                                             progress=progress, cataloged=cataloged)
+                    for key, value in stats.items():
+                        totals[key] += value
+                except Exception as e:
+                    print(f"❌ Error scanning {folder}: {e}")
+            print(f"📚 Library scan: {totals}")
+            self.root.after(0, self.on_library_scanned)
+        
+        self.update_library_status("Scanning for new and changed books...")
+        threading.Thread(target=scan_thread, daemon=True).start()
+        
+    def on_library_scanned(self):
+        """Show the scanned library and scan the folders that were added meanwhile"""
+        self.library_scanning = False
+        self.refresh_catalog()
+        self.update_library_status()
+        if self.library_scan_queue:
+            folders, self.library_scan_queue = self.library_scan_queue, []
+            self.rescan_library(folders)
+        
+    def show_library(self):
+        """Show every book in the library folders with its cover, and rescan for new ones"""
+        if self.catalog_window is not None and self.catalog_window.winfo_exists():
+            self.catalog_window.lift()
+            return
+        
+        try:
+            self.get_library_index()
+        except Exception as e:
+            messagebox.showerror("Library", f"Failed to open the library index: {e}")
+            return
+        
+        self.catalog_window = tk.Toplevel(self.root)
+        self.catalog_window.title("Library")
+        self.catalog_window.geometry("760x520")
+        self.catalog_window.transient(self.root)
+        self.catalog_cover_image = None
+        
+        main_frame = ttk.Frame(self.catalog_window, padding=10)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        folder_frame = ttk.Frame(main_frame)
+        folder_frame.pack(fill=tk.X, pady=(0, 10))
+        self.catalog_status_label = ttk.Label(folder_frame, text="")
+        self.catalog_status_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        ttk.Button(folder_frame, text="Rescan", command=self.rescan_library).pack(side=tk.RIGHT, padx=(5, 0))
+        ttk.Button(folder_frame, text="Add Folder...", command=self.add_library_folder).pack(side=tk.RIGHT)
+        
+        # Cover and details of the highlighted book
+        details_frame = ttk.Frame(main_frame, width=220)
+        details_frame.pack(side=tk.RIGHT, fill=tk.Y, padx=(10, 0))
+        details_frame.pack_propagate(False)
+        self.catalog_cover = ttk.Label(details_frame, anchor=tk.CENTER)
+        self.catalog_cover.pack(fill=tk.X, pady=(0, 10))
+        self.catalog_details = ttk.Label(details_frame, text="", wraplength=210, justify=tk.LEFT)
+        self.catalog_details.pack(fill=tk.X)
+        ttk.Button(details_frame, text="Open", command=self.open_highlighted_book).pack(side=tk.BOTTOM, fill=tk.X)
+        
+        self.catalog_list = VirtualList(main_frame, activate="double", on_highlight=self.show_catalog_book,
+                                        on_select=lambda index: self.open_catalog_book(self.catalog_books[index]))
+        self.catalog_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        self.refresh_catalog()
+        self.catalog_list.filter_entry.focus_set()
+        if self.settings.get("library_folders"):
+            # Cheap when nothing changed: only new and modified files are opened
+            self.rescan_library()
+        
+    def refresh_catalog(self):
+        """Reload the book list of the library window from the catalog"""
+        if self.catalog_window is None or not self.catalog_window.winfo_exists():
+            return
+        from library_index import describe
+        with tracer.span("catalog_books"):
+            self.catalog_books = self.get_library_index().books()
+        self.catalog_list.set_items([describe(book) for book in self.catalog_books])
+        self.update_library_status()
+        
+    def show_catalog_book(self, index):
+        """Show the details and cover of the highlighted book; covers are made off the Tk thread"""
+        book = self.catalog_books[index]
+        details = [book['title'], f"by {book['author']}"]
+        if book['series']:
+            position = f" #{book['series_index']:g}" if book['series_index'] is not None else ""
+            details.append(f"Series: {book['series']}{position}")
+        details.append(os.path.basename(book['path']))
+        self.catalog_details.config(text="\n".join(details))
+        self.catalog_cover.config(image="")
+        self.catalog_cover_image = None
+        if not book['cover']:
+            return
+        
+        library = self.get_library_index()
+        
+        def cover_thread():
+            path = library.thumbnail(book)
+            self.root.after(0, lambda: self.show_catalog_cover(book, path))
+        
+        threading.Thread(target=cover_thread, daemon=True).start()
+        
+    def show_catalog_cover(self, book, path):
+        """Show a cover thumbnail if its book is still the highlighted one"""
+        if self.catalog_window is None or not self.catalog_window.winfo_exists() or path is None:
+            return
+        selected = self.catalog_list.selected
+        if selected is None or self.catalog_books[selected] is not book:
+            return
+        try:
+            self.catalog_cover_image = tk.PhotoImage(file=path)
+        except tk.TclError as e:
+            print(f"❌ Error showing cover {path}: {e}")
+            return
+        self.catalog_cover.config(image=self.catalog_cover_image)
+        
+    def open_highlighted_book(self):
+        if self.catalog_list.selected is not None:
+            self.open_catalog_book(self.catalog_books[self.catalog_list.selected])
+        
+    def open_catalog_book(self, book):
+        """Open a book chosen in the library window"""
+        if not os.path.exists(book['path']):
+            messagebox.showerror("Library", f"File not found: {book['path']}")
+        elif book['path'] != os.path.abspath(self.current_book_path) or not self.chapters:
+            self.load_epub(book['path'])
+        
+    def open_library_hit(self, hit):
+        """Open a library search hit at its chapter"""
+        if hit['path'] == os.path.abspath(self.current_book_path) and self.chapters:
+            self.load_chapter(hit['chapter'])
+        elif os.path.exists(hit['path']):
+            self.load_epub(hit['path'], start_chapter=hit['chapter'])
+        else:
+            messagebox.showerror("Library Search", f"File not found: {hit['path']}")
+        
+    def show_diagnostics(self):
+        """Show per-phase timings and allow exporting them as a Chrome trace"""
+        diag_window = tk.Toplevel(self.root)
+        diag_window.title("Performance Diagnostics")
+        diag_window.geometry("640x420")
+        diag_window.transient(self.root)
+        
+        main_frame = ttk.Frame(diag_window, padding=10)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        enabled_var = tk.BooleanVar(value=tracer.enabled)
+        
+        def toggle_timing():
+            tracer.enabled = enabled_var.get()
+            self.settings["timing_enabled"] = tracer.enabled
+            self.save_settings()
+        
+        ttk.Checkbutton(main_frame, text="Record phase timings", variable=enabled_var,
+                        command=toggle_timing).pack(anchor=tk.W, pady=(0, 10))
+        
+        # Phase summary table
+        table_frame = ttk.Frame(main_frame)
+        table_frame.pack(fill=tk.BOTH, expand=True)
+        
+        columns = ("count", "total", "mean", "max", "last")
+        tree = ttk.Treeview(table_frame, columns=columns, height=12)
+        tree.heading("#0", text="Phase")
+        tree.column("#0", width=200)
+        for column, heading in zip(columns, ("Calls", "Total ms", "Mean ms", "Max ms", "Last ms")):
+            tree.heading(column, text=heading)
+            tree.column(column, width=80, anchor=tk.E)
+        tree_scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=tree_scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        tree_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        def refresh():
+            tree.delete(*tree.get_children())
+            for stats in tracer.summary():
+                tree.insert("", tk.END, text=stats["name"], values=(
+                    stats["count"],
+                    f"{stats['total_ms']:.1f}",
+                    f"{stats['mean_ms']:.1f}",
+                    f"{stats['max_ms']:.1f}",
+                    f"{stats['last_ms']:.1f}"))
+        
+        def clear():
+            tracer.clear()
+            refresh()
+        
+        def export_trace():
+            path = filedialog.asksaveasfilename(
+                title="Export Chrome Trace",
+                defaultextension=".json",
+                initialfile="epub_reader_trace.json",
+                filetypes=[("Trace JSON", "*.json"), ("All files", "*.*")]
+            )
+            if path:
+                try:
+                    tracer.export_chrome_trace(path)
+                    messagebox.showinfo("Export Trace",
+                                      f"Trace saved to {path}.\n"
+                                      f"Open it in chrome://tracing or ui.perfetto.dev.")
+                except Exception as e:
+                    messagebox.showerror("Export Trace", f"Failed to export trace: {e}")
+        
+        # Buttons frame
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(fill=tk.X, pady=(10, 0))
+        ttk.Button(button_frame, text="Close", command=diag_window.destroy).pack(side=tk.RIGHT, padx=(5, 0))
+        ttk.Button(button_frame, text="Export Trace...", command=export_trace).pack(side=tk.RIGHT, padx=(5, 0))
+        ttk.Button(button_frame, text="Clear", command=clear).pack(side=tk.RIGHT, padx=(5, 0))
+        ttk.Button(button_frame, text="Refresh", command=refresh).pack(side=tk.RIGHT)
+        
+        refresh()
+        
     def show_about(self):
         about_text = """EPUB Reader v2.0
 
@@ -1079,12 +2488,13 @@ Ctrl+O: Open EPUB
 Ctrl++: Increase font size
 Ctrl+-: Decrease font size
 Ctrl+D: Toggle dark mode
+Left/Right: Previous/next page
 Ctrl+Left: Previous chapter
 Ctrl+Right: Next chapter
 
 Navigation:
-• Right-click on any page to go to next chapter
-• Mouse wheel to navigate between chapters
+• Right-click on any page to go to next page
+• Mouse wheel to turn pages
 
 Created with Python and tkinter"""
         
@@ -0,0 +1,178 @@
+"""
+Highlights and notes for EPUB Reader
+
+Highlights are character ranges of a chapter's text. Each chapter keeps its
+ranges in an IntervalIndex, so a page turn only looks up the few that
+overlap the visible spread, however many the book has.
+
+Every book has its own journal file of JSON lines. Adding, removing or
+annotating a highlight appends one line instead of rewriting everything.
+The journal is replayed when the book opens and compacted when most of its
+lines are obsolete. A line torn by a crash is skipped on the next load.
+"""
+
+import os
+import json
+import time
+import hashlib
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+DEFAULT_COLOR = "#fff59d"
+# Compact a journal once it has this many more lines than live highlights
+COMPACT_SLACK = 200
+
+
+class IntervalIndex:
+    """Ranges of one chapter sorted by start, with a running maximum of their ends
+
+    Overlap queries bisect twice: the running maximum finds the first range
+    that can reach the query start, and the starts find where ranges begin
+    after the query end.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.ids = []
+        self._max_ends = None
+
+    def add(self, start, end, highlight_id):
+        position = bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.ids.insert(position, highlight_id)
+        self._max_ends = None
+
+    def remove(self, highlight_id):
+        position = self.ids.index(highlight_id)
+        del self.starts[position], self.ends[position], self.ids[position]
+        self._max_ends = None
+
+    def overlapping(self, start, end):
+        """Return the ids of ranges that overlap [start, end), in order of start"""
+        if self._max_ends is None:
+            self._max_ends = list(accumulate(self.ends, max))
+        first = bisect_right(self._max_ends, start)
+        last = bisect_left(self.starts, end)
+        return [self.ids[i] for i in range(first, last) if self.ends[i] > start]
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class HighlightStore:
+    """The highlights and notes of one book, persisted as an append-only journal"""
+
+    def __init__(self, path):
+        self.path = path
+        self.highlights = {}
+        self._chapters = {}
+        self._next_id = 1
+        self._lines = 0
+        self._file = None
+        self._torn = False
+        self._load()
+
+    @staticmethod
+    def path_for(book_path, directory="epub_reader_highlights"):
+        """Return the journal file used for a book"""
+        key = hashlib.sha1(os.path.abspath(book_path).encode('utf-8')).hexdigest()
+        return os.path.join(directory, f"{key}.jsonl")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._torn = not line.endswith("\n")
+                    try:
+                        self._apply(json.loads(line))
+                    except (ValueError, KeyError, TypeError):
+                        # A line torn by a crash; everything before it is intact
+                        continue
+                    self._lines += 1
+        except OSError as e:
+            print(f"❌ Error loading highlights: {e}")
+            return
+        if self._lines > len(self.highlights) + COMPACT_SLACK:
+            self.compact()
+
+    def _apply(self, record):
+        op = record["op"]
+        if op == "add":
+            highlight = record["highlight"]
+            self.highlights[highlight["id"]] = highlight
+            self._chapters.setdefault(highlight["chapter"], IntervalIndex()).add(
+                highlight["start"], highlight["end"], highlight["id"])
+            self._next_id = max(self._next_id, highlight["id"] + 1)
+        elif op == "remove":
+            highlight = self.highlights.pop(record["id"])
+            self._chapters[highlight["chapter"]].remove(highlight["id"])
+        elif op == "note":
+            self.highlights[record["id"]]["note"] = record["note"]
+
+    def _append(self, record):
+        """Apply a change and add it to the journal"""
+        self._apply(record)
+        try:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+                if self._torn:
+                    # Keep the torn line from swallowing the next record
+                    self._file.write("\n")
+                    self._torn = False
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+            self._lines += 1
+        except OSError as e:
+            print(f"❌ Error saving highlight: {e}")
+
+    def add(self, chapter, start, end, text="", note="", color=DEFAULT_COLOR):
+        """Highlight [start, end) of a chapter and return the new highlight"""
+        highlight = {"id": self._next_id, "chapter": chapter, "start": start, "end": end,
+                     "color": color, "note": note, "text": text, "created": time.time()}
+        self._append({"op": "add", "highlight": highlight})
+        return highlight
+
+    def remove(self, highlight_id):
+        if highlight_id in self.highlights:
+            self._append({"op": "remove", "id": highlight_id})
+
+    def set_note(self, highlight_id, note):
+        if highlight_id in self.highlights:
+            self._append({"op": "note", "id": highlight_id, "note": note})
+
+    def overlapping(self, chapter, start, end):
+        """Return the highlights of a chapter that overlap [start, end)"""
+        index = self._chapters.get(chapter)
+        if index is None:
+            return []
+        return [self.highlights[highlight_id] for highlight_id in index.overlapping(start, end)]
+
+    def all(self):
+        """Every highlight in reading order"""
+        return sorted(self.highlights.values(), key=lambda highlight: (highlight["chapter"], highlight["start"]))
+
+    def __len__(self):
+        return len(self.highlights)
+
+    def compact(self):
+        """Rewrite the journal with one line per live highlight"""
+        self.close()
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for highlight in self.all():
+                    f.write(json.dumps({"op": "add", "highlight": highlight}, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+            self._lines = len(self.highlights)
+        except OSError as e:
+            print(f"❌ Error compacting highlights: {e}")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
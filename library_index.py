@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+Library catalog and full-text search for EPUB Reader using SQLite FTS5
+
+A scan reads every new or changed book in two passes. The first reads title,
+author, series and cover location straight from META-INF/container.xml and
+the OPF inside each zip, without parsing a single chapter, so the whole
+library can be listed within seconds. The second extracts chapter text with
+the reader's own engine into an FTS5 table. Both run in parallel worker
+processes, and each book row remembers the file's size and mtime, so a rescan
+only opens books that were added or changed.
+
+A scan only records where each cover is in its zip, since decoding covers
+would cost more than reading all the metadata. A cover is decoded the first
+time it is shown and kept in a cache directory as a small PNG, which Tk can
+show without Pillow; the file name includes the book's size and mtime, so a
+changed book gets a new thumbnail.
+
+Examples:
+    python library_index.py ~/books
+    python library_index.py --list
+    python library_index.py --search '"white whale" ahab'
+"""
+
+import os
+import re
+import sys
+import time
+import sqlite3
+import hashlib
+import zipfile
+import threading
+import argparse
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from epub_engine import EpubSource, extract_book, find_epubs
+from search_index import CJK_RANGES, parse_query
+
+SCHEMA_VERSION = 2
+THUMBNAIL_SIZE = (120, 180)
+# Reading one book's metadata takes well under a millisecond, so books go to the
+# workers in batches and small scans are not worth starting a process pool
+BATCH_SIZE = 32
+
+# Chapter rows use rowid = book_id << CHAPTER_BITS | chapter_index, so a
+# book's chapters can be deleted with a rowid range instead of a table scan
+CHAPTER_BITS = 20
+
+_CJK_CHAR = re.compile(f"([{CJK_RANGES}])")
+# A space between two CJK characters or CJK punctuation, possibly next to a snippet marker
+_CJK_TEXT = CJK_RANGES + "\u3000-\u303f\uff00-\uffef"
+_CJK_GAP = re.compile(f"(?<=[{_CJK_TEXT}])([«»]?) ([«»]?)(?=[{_CJK_TEXT}])")
+
+
+def spaced_cjk(text):
+    """Put spaces around CJK characters so FTS5's unicode61 tokenizer indexes each one"""
+    return _CJK_CHAR.sub(r" \1 ", text)
+
+
+def unspaced_cjk(text):
+    """Undo spaced_cjk for display"""
+    return _CJK_GAP.sub(r"\1\2", re.sub(r" {2,}", " ", text)).strip()
+
+
+def to_fts_query(query):
+    """Translate the reader's query syntax into an FTS5 MATCH expression"""
+    phrases = parse_query(query)
+    return " ".join('"' + " ".join(tokens) + '"' for tokens in phrases)
+
+
+def folder_changes(directory, known):
+    """Compare the books under directory with known fingerprints
+
+    known maps absolute paths to (size, mtime). Returns (found, changed,
+    removed): the fingerprint of every book under directory, the paths of
+    those that are new or changed, and the known paths under directory
+    that no longer exist.
+    """
+    directory = os.path.abspath(directory)
+    found = {}
+    for path in find_epubs(directory):
+        stat = os.stat(path)
+        found[os.path.abspath(path)] = (stat.st_size, stat.st_mtime_ns)
+    changed = [path for path, fingerprint in found.items() if known.get(path) != fingerprint]
+    prefix = directory.rstrip(os.sep) + os.sep
+    removed = [path for path in known
+               if (path == directory or path.startswith(prefix)) and path not in found]
+    return found, changed, removed
+
+
+def thumbnail_name(book_path, size, mtime):
+    """Return the file name of a book version's cover thumbnail in the cover cache"""
+    key = f"{os.path.abspath(book_path)}\0{size}\0{mtime}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest() + ".png"
+
+
+def catalog_book(path):
+    """Read one book's metadata from its OPF and return the catalog fields"""
+    source = EpubSource(path)
+    try:
+        return {
+            'title': source.title or os.path.splitext(os.path.basename(path))[0],
+            'author': source.author or "Unknown Author",
+            'series': source.series,
+            'series_index': source.series_index,
+            'cover': source.zip_path(source.cover_href) if source.cover_href else None
+        }
+    finally:
+        source.close()
+
+
+def _catalog_batch(paths):
+    """Process pool task: catalog a batch of books, returning (path, entry, error) for each"""
+    results = []
+    for path in paths:
+        try:
+            results.append((path, catalog_book(path), None))
+        except Exception as e:
+            results.append((path, None, str(e)))
+    return results
+
+
+def _run_tasks(function, items, workers, cancelled):
+    """Yield (item, result, error) for each item, in a process pool unless there is only one"""
+    workers = workers or os.cpu_count() or 1
+    if len(items) <= 1 or workers == 1:
+        for item in items:
+            if cancelled is not None and cancelled():
+                return
+            try:
+                yield item, function(item), None
+            except Exception as e:
+                yield item, None, e
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(items))) as pool:
+        futures = {pool.submit(function, item): item for item in items}
+        try:
+            for future in as_completed(futures):
+                if cancelled is not None and cancelled():
+                    return
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], None, e
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def describe(book):
+    """One-line description of a book, as shown in the library list"""
+    text = f"{book['title']} — {book['author']}"
+    if book['series']:
+        position = book['series_index']
+        if position is not None:
+            text += f" ({book['series']} #{position:g})"
+        else:
+            text += f" ({book['series']})"
+    return text
+
+
+class LibraryIndex:
+    """SQLite catalog and FTS5 index of every book under some folders
+
+    A book row with a NULL indexed_at is cataloged but its text is not
+    searchable yet; a scan that was cancelled or interrupted picks it up next
+    time even though the file did not change.
+    """
+
+    def __init__(self, db_path="epub_library.db", cover_dir="epub_reader_covers"):
+        self.db_path = db_path
+        self.cover_dir = cover_dir
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS books (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT UNIQUE NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime INTEGER NOT NULL,
+                    title TEXT,
+                    author TEXT,
+                    series TEXT,
+                    series_index REAL,
+                    cover TEXT,  -- zip member of the cover image
+                    chapters INTEGER,
+                    cataloged_at REAL,
+                    indexed_at REAL
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS chapters USING fts5(title, body);
+            """)
+            if conn.execute("PRAGMA user_version").fetchone()[0] < 2:
+                # Version 1 had no catalog columns; its books are recataloged, keeping their text
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(books)")}
+                for name, kind in (("series", "TEXT"), ("series_index", "REAL"),
+                                   ("cover", "TEXT"), ("cataloged_at", "REAL")):
+                    if name not in columns:
+                        conn.execute(f"ALTER TABLE books ADD COLUMN {name} {kind}")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _connect(self):
+        """Open a connection; WAL lets the reader list and search while a scan is writing"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def scan(self, directory, workers=0, backend="lxml", progress=None, cataloged=None, cancelled=None):
+        """Catalog and index new and changed books under directory and drop deleted ones
+
+        progress(stage, done, total, path) is called as books are read, with
+        stage "catalog" while reading metadata (path is None, as books are
+        read in batches) and "index" while extracting text. cataloged() is
+        called once every book is listed, before any text is extracted.
+        Returns a dict with cataloged, indexed, unchanged, removed and failed
+        counts.
+        """
+        conn = self._connect()
+        try:
+            known = {}
+            uncataloged = set()
+            for book_id, path, size, mtime, cataloged_at in conn.execute(
+                    "SELECT id, path, size, mtime, cataloged_at FROM books"):
+                known[path] = (book_id, size, mtime)
+                if cataloged_at is None:
+                    uncataloged.add(path)
+            found, changed, removed = folder_changes(directory, {path: (size, mtime) for path, (_, size, mtime)
+                                                                 in known.items()})
+
+            with conn:
+                for path in removed:
+                    self._delete_book(conn, known[path][0])
+                # Text of changed books is stale; it is extracted again below
+                for path in changed:
+                    if path in known:
+                        self._delete_chapters(conn, known[path][0])
+                        conn.execute("UPDATE books SET chapters = NULL, indexed_at = NULL WHERE id = ?",
+                                     (known[path][0],))
+            # Thumbnails of removed and changed books are stale
+            for path in removed + changed:
+                if path in known:
+                    self._remove_thumbnail(thumbnail_name(path, *known[path][1:]))
+
+            stats = {"cataloged": 0, "indexed": 0, "unchanged": len(found) - len(changed),
+                     "removed": len(removed), "failed": 0}
+            to_catalog = changed + [path for path in found if path in uncataloged and path not in changed]
+            self._catalog(conn, to_catalog, found, known, workers, progress, cancelled, stats)
+            if cataloged is not None:
+                cataloged()
+
+            to_index = [path for path, in conn.execute("SELECT path FROM books WHERE indexed_at IS NULL")
+                        if path in found]
+            extract = partial(extract_book, backend=backend)
+            for done, (path, book, error) in enumerate(_run_tasks(extract, to_index, workers, cancelled), 1):
+                if book is None:
+                    stats["failed"] += 1
+                    print(f"❌ Could not index {path}: {error}")
+                else:
+                    with conn:
+                        self._store_text(conn, path, book)
+                    stats["indexed"] += 1
+                if progress is not None:
+                    progress("index", done, len(to_index), path)
+            return stats
+        finally:
+            conn.close()
+
+    def _catalog(self, conn, paths, found, known, workers, progress, cancelled, stats):
+        """Read and store the metadata of some books in batches"""
+        batches = [tuple(paths[i:i + BATCH_SIZE]) for i in range(0, len(paths), BATCH_SIZE)]
+        done = 0
+        for batch, results, error in _run_tasks(_catalog_batch, batches, workers, cancelled):
+            if results is None:
+                results = [(path, None, error) for path in batch]
+            rows = []
+            with conn:
+                for path, entry, reason in results:
+                    if entry is None:
+                        stats["failed"] += 1
+                        print(f"❌ Could not catalog {path}: {reason}")
+                        # A book that cannot be read is not listed, whatever it was before
+                        if path in known:
+                            self._delete_book(conn, known[path][0])
+                        continue
+                    size, mtime = found[path]
+                    rows.append((path, size, mtime, entry['title'], entry['author'], entry['series'],
+                                 entry['series_index'], entry['cover'], time.time()))
+                conn.executemany(
+                    "INSERT INTO books (path, size, mtime, title, author, series, series_index, cover, "
+                    "cataloged_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (path) DO UPDATE SET "
+                    "size = excluded.size, mtime = excluded.mtime, title = excluded.title, "
+                    "author = excluded.author, series = excluded.series, series_index = excluded.series_index, "
+                    "cover = excluded.cover, cataloged_at = excluded.cataloged_at", rows)
+            stats["cataloged"] += len(rows)
+            done += len(batch)
+            if progress is not None:
+                progress("catalog", done, len(paths), None)
+
+    def _delete_chapters(self, conn, book_id):
+        conn.execute("DELETE FROM chapters WHERE rowid BETWEEN ? AND ?",
+                     (book_id << CHAPTER_BITS, ((book_id + 1) << CHAPTER_BITS) - 1))
+
+    def _delete_book(self, conn, book_id):
+        self._delete_chapters(conn, book_id)
+        conn.execute("DELETE FROM books WHERE id = ?", (book_id,))
+
+    def _store_text(self, conn, path, book):
+        """Replace the chapter text of a cataloged book"""
+        row = conn.execute("SELECT id FROM books WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            return
+        book_id = row[0]
+        self._delete_chapters(conn, book_id)
+        conn.executemany(
+            "INSERT INTO chapters (rowid, title, body) VALUES (?, ?, ?)",
+            (((book_id << CHAPTER_BITS) | index, chapter['title'], spaced_cjk(chapter['content'] or ""))
+             for index, chapter in enumerate(book['chapters'])
+             if index < (1 << CHAPTER_BITS)))
+        conn.execute("UPDATE books SET chapters = ?, indexed_at = ? WHERE id = ?",
+                     (len(book['chapters']), time.time(), book_id))
+
+    def _remove_thumbnail(self, name):
+        try:
+            os.remove(os.path.join(self.cover_dir, name))
+        except OSError:
+            pass
+
+    def books(self):
+        """Return every cataloged book as a dict, sorted by author, series and title"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT path, size, mtime, title, author, series, series_index, cover FROM books "
+                "WHERE cataloged_at IS NOT NULL "
+                "ORDER BY author COLLATE NOCASE, series COLLATE NOCASE, series_index, title COLLATE NOCASE"
+            ).fetchall()
+        finally:
+            conn.close()
+        return [{'path': path, 'size': size, 'mtime': mtime, 'title': title, 'author': author,
+                 'series': series, 'series_index': series_index, 'cover': cover}
+                for path, size, mtime, title, author, series, series_index, cover in rows]
+
+    def thumbnail(self, book):
+        """Return the cover thumbnail file of a cataloged book, making it on first use
+
+        Returns None if the book has no cover or it cannot be read. Safe to
+        call from worker threads.
+        """
+        if not book['cover']:
+            return None
+        path = os.path.join(self.cover_dir, thumbnail_name(book['path'], book['size'], book['mtime']))
+        if os.path.exists(path):
+            return path
+        try:
+            from page_images import decode_image
+            with zipfile.ZipFile(book['path']) as archive:
+                data = archive.read(book['cover'])
+            os.makedirs(self.cover_dir, exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            decode_image(data, *THUMBNAIL_SIZE).save(tmp_path, "PNG", compress_level=1)
+            os.replace(tmp_path, path)
+            return path
+        except Exception as e:
+            print(f"❌ Could not read the cover of {book['path']}: {e}")
+            return None
+
+    def search(self, query, limit=100):
+        """Return ranked chapter hits as dicts with path, title, author, chapter and snippet"""
+        fts_query = to_fts_query(query)
+        if not fts_query:
+            return []
+
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT rowid, title, snippet(chapters, 1, '«', '»', '…', 16) FROM chapters "
+                "WHERE chapters MATCH ? ORDER BY rank LIMIT ?", (fts_query, limit)).fetchall()
+            book_ids = {rowid >> CHAPTER_BITS for rowid, _, _ in rows}
+            books = {}
+            if book_ids:
+                placeholders = ",".join("?" * len(book_ids))
+                for book_id, path, title, author in conn.execute(
+                        f"SELECT id, path, title, author FROM books WHERE id IN ({placeholders})",
+                        tuple(book_ids)):
+                    books[book_id] = (path, title, author)
+        finally:
+            conn.close()
+
+        hits = []
+        for rowid, chapter_title, snippet in rows:
+            book = books.get(rowid >> CHAPTER_BITS)
+            if book is None:
+                continue
+            hits.append({
+                'path': book[0],
+                'title': book[1],
+                'author': book[2],
+                'chapter': rowid & ((1 << CHAPTER_BITS) - 1),
+                'chapter_title': chapter_title,
+                'snippet': unspaced_cjk(snippet)
+            })
+        return hits
+
+    def book_count(self):
+        """Return the number of cataloged books and how many of them are searchable"""
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(cataloged_at), COUNT(indexed_at) FROM books").fetchone()
+        finally:
+            conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Catalog and index a folder of EPUBs for full-text search.")
+    parser.add_argument("folders", nargs="*", help="folders to (re)scan")
+    parser.add_argument("--db", default="epub_library.db", help="SQLite database path")
+    parser.add_argument("--covers", default="epub_reader_covers", help="cover thumbnail directory")
+    parser.add_argument("-j", "--jobs", type=int, default=0, help="worker processes (default: one per CPU)")
+    parser.add_argument("--list", action="store_true", help="print the catalog")
+    parser.add_argument("--thumbnails", action="store_true", help="make every missing cover thumbnail")
+    parser.add_argument("--search", help="run a query against the index")
+    args = parser.parse_args(argv)
+
+    index = LibraryIndex(args.db, args.covers)
+    for folder in args.folders:
+        start = time.perf_counter()
+
+        def progress(stage, done, total, path):
+            if stage == "index":
+                print(f"📖 [{done}/{total}] {path}", file=sys.stderr)
+
+        def cataloged():
+            print(f"📇 {folder}: cataloged in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+        stats = index.scan(folder, workers=args.jobs, progress=progress, cataloged=cataloged)
+        print(f"📚 {folder}: {stats['cataloged']} cataloged, {stats['indexed']} indexed, "
+              f"{stats['unchanged']} unchanged, {stats['removed']} removed, {stats['failed']} failed "
+              f"in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+    if args.thumbnails:
+        start = time.perf_counter()
+        made = sum(1 for book in index.books() if index.thumbnail(book))
+        print(f"🖼️ {made} cover thumbnails in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+    if args.list:
+        for book in index.books():
+            print(f"{describe(book)}\n    {book['path']}")
+
+    if args.search:
+        start = time.perf_counter()
+        hits = index.search(args.search)
+        for hit in hits:
+            print(f"{hit['title']} — {hit['author']} — {hit['chapter'] + 1}. {hit['chapter_title']}\n"
+                  f"    {hit['snippet']}\n    {hit['path']}")
+        print(f"🔍 {len(hits)} hits in {(time.perf_counter() - start) * 1000:.1f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Navigation index for EPUB Reader
+
+The table of contents of a book (its EPUB 3 nav document or EPUB 2 NCX),
+flattened into entries that each point at a chapter and a character offset
+in that chapter's text. Offsets of entries that link to an anchor inside a
+document are found once, when the document is parsed, and are stored with
+the book in the book cache. After that, jumping to any entry, however deeply
+nested, needs no text scanning.
+"""
+
+from bisect import bisect_right
+
+
+class NavIndex:
+    """Table of contents entries mapped to (chapter, offset) locations
+
+    Each entry is a dict with title, level (0 for top-level entries),
+    chapter, anchor (the fragment id, or None) and offset (None while the
+    anchor has not been located yet).
+    """
+
+    def __init__(self, entries=None):
+        self.entries = entries or []
+        self._keys = None
+        self._order = None
+
+    @classmethod
+    def from_json(cls, data):
+        return cls([dict(entry) for entry in data or []])
+
+    def to_json(self):
+        return self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __bool__(self):
+        return bool(self.entries)
+
+    def titles(self, start=0, end=None, indent="    "):
+        """Entry titles indented by nesting level, for list widgets"""
+        return [indent * entry['level'] + entry['title'] for entry in self.entries[start:end]]
+
+    def chapter_titles(self, fallbacks):
+        """Return a title for every chapter: its first entry, else the title of the chapter before it
+
+        fallbacks holds the names to use for chapters before the first
+        entry, such as a cover page.
+        """
+        titles = [None] * len(fallbacks)
+        for entry in self.entries:
+            if titles[entry['chapter']] is None:
+                titles[entry['chapter']] = entry['title']
+        previous = None
+        for index, title in enumerate(titles):
+            if title is None:
+                titles[index] = previous or fallbacks[index]
+            else:
+                previous = title
+        return titles
+
+    def unresolved(self):
+        """Return the chapters that still have anchors without an offset, in order"""
+        return sorted({entry['chapter'] for entry in self.entries if entry['offset'] is None})
+
+    def anchors(self, chapter):
+        """Return the anchors in a chapter that still need an offset"""
+        return {entry['anchor'] for entry in self.entries
+                if entry['chapter'] == chapter and entry['offset'] is None}
+
+    def set_offsets(self, chapter, offsets):
+        """Record the offsets found for a chapter's anchors; anchors not found point at its start"""
+        for entry in self.entries:
+            if entry['chapter'] == chapter and entry['offset'] is None:
+                entry['offset'] = offsets.get(entry['anchor'], 0)
+        self._keys = None
+
+    def entry_at(self, chapter, offset):
+        """Return the index of the entry whose section contains a location, or None before the first one"""
+        if self._keys is None:
+            # Entries are usually in reading order, but nothing guarantees it
+            self._order = sorted(range(len(self.entries)), key=lambda i: (self.entries[i]['chapter'],
+                                                                         self.entries[i]['offset'] or 0, i))
+            self._keys = [(self.entries[i]['chapter'], self.entries[i]['offset'] or 0) for i in self._order]
+        position = bisect_right(self._keys, (chapter, offset))
+        return self._order[position - 1] if position else None
@@ -0,0 +1,128 @@
+"""
+Image decoding for EPUB Reader
+
+Images are decoded on a background thread and scaled down to the page they
+are shown on, so a page turn never waits for Pillow. JPEGs are decoded at
+reduced size by libjpeg itself (draft mode), which for a large scan is many
+times faster and smaller than decoding it whole and then shrinking it.
+
+Decoded images are kept in an LRU cache bounded by their size in bytes, so
+paging back and forth through an illustrated book or a manga reuses them
+while memory stays bounded however many images the book has.
+"""
+
+import io
+import threading
+import zipfile
+from collections import OrderedDict
+
+from PIL import Image
+
+# Requests beyond this many are dropped, oldest first, when paging faster than images decode
+MAX_PENDING = 16
+
+
+def decode_image(data, max_width, max_height):
+    """Decode image bytes scaled down to fit max_width x max_height, in a mode Tk can show"""
+    image = Image.open(io.BytesIO(data))
+    if image.format == "JPEG":
+        # libjpeg scales by 1/2, 1/4 or 1/8 while decoding, keeping at least the requested size
+        image.draft("RGB", (max_width, max_height))
+    image.thumbnail((max_width, max_height), Image.LANCZOS, reducing_gap=2.0)
+    if image.mode not in ("RGB", "RGBA", "L"):
+        image = image.convert("RGBA" if image.mode in ("LA", "PA") or "transparency" in image.info else "RGB")
+    return image
+
+
+class ImageCache:
+    """LRU cache of decoded images bounded by their total size in bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._items = OrderedDict()
+
+    def get(self, key):
+        item = self._items.get(key)
+        if item is None:
+            return None
+        self._items.move_to_end(key)
+        return item[0]
+
+    def put(self, key, image, size):
+        if key in self._items:
+            self.bytes -= self._items.pop(key)[1]
+        if size > self.max_bytes:
+            return
+        self._items[key] = (image, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, evicted) = self._items.popitem(last=False)
+            self.bytes -= evicted
+
+    def clear(self):
+        self._items.clear()
+        self.bytes = 0
+
+    def __len__(self):
+        return len(self._items)
+
+
+class ImageLoader:
+    """Decodes book images on a daemon thread, most recent request first
+
+    Requests are keyed by (book path, zip member, max width, max height).
+    deliver(key, image) is called on the loader thread with the decoded
+    PIL image, or None if the image could not be read.
+    """
+
+    def __init__(self, deliver):
+        self.deliver = deliver
+        self._pending = OrderedDict()
+        self._condition = threading.Condition()
+        self._thread = None
+        # Only the loader thread touches the open zip
+        self._zip = None
+
+    def request(self, key, urgent=True):
+        """Queue an image; urgent requests (the visible spread) go before prefetches"""
+        with self._condition:
+            if key in self._pending:
+                if urgent:
+                    self._pending.move_to_end(key)
+            else:
+                self._pending[key] = None
+                if not urgent:
+                    self._pending.move_to_end(key, last=False)
+                while len(self._pending) > MAX_PENDING:
+                    self._pending.popitem(last=False)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def cancel(self):
+        """Drop every request that has not started decoding"""
+        with self._condition:
+            self._pending.clear()
+
+    def _read(self, book_path, member):
+        if self._zip is None or self._zip.filename != book_path:
+            if self._zip is not None:
+                self._zip.close()
+            self._zip = zipfile.ZipFile(book_path)
+        return self._zip.read(member)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                key, _ = self._pending.popitem()
+            book_path, member, max_width, max_height = key
+            try:
+                image = decode_image(self._read(book_path, member), max_width, max_height)
+            except Exception as e:
+                print(f"❌ Error decoding image {member}: {e}")
+                image = None
+            self.deliver(key, image)
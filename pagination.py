@@ -0,0 +1,186 @@
+"""
+Page layout for EPUB Reader
+
+Breaks chapter text into pages the way a word-wrapping Text widget of a
+given size would lay it out, using the real font metrics. Pages are
+character offsets into the chapter string, so rendering a page is a slice
+and no text is copied or re-joined.
+"""
+
+import re
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+
+from search_index import CJK_RANGES
+
+# Whitespace before each word; CJK characters are words of their own since
+# lines can break between any two of them
+WORD_RE = re.compile(f"(\\s*)([{CJK_RANGES}]|[^\\s{CJK_RANGES}]+)")
+
+# Pixels kept free at the right edge so rounding never wraps a line that we
+# counted as fitting
+WIDTH_SAFETY = 2
+
+# Stands for an image in chapter text; an image gets a page of its own
+IMAGE_MARK = "\ufffc"
+
+
+class FontMetrics:
+    """Cached text widths for one font"""
+
+    def __init__(self, measure, line_height):
+        self._measure = measure
+        self.line_height = line_height
+        self._widths = {}
+
+    def width(self, text):
+        width = self._widths.get(text)
+        if width is None:
+            width = self._widths[text] = self._measure(text)
+        return width
+
+
+class Paginator:
+    """Computes page breaks for text in pages of a fixed pixel size"""
+
+    def __init__(self, metrics, width, height):
+        self.metrics = metrics
+        self.width = width - WIDTH_SAFETY
+        self.lines_per_page = max(1, height // metrics.line_height)
+
+    def page_end(self, text, start, max_lines):
+        """Return where a page starting at offset start ends, which is where the next one begins"""
+        width_of = self.metrics.width
+        max_width = self.width
+        lines = 1
+        line_width = 0
+
+        for match in WORD_RE.finditer(text, start):
+            space, word = match.group(1), match.group(2)
+            if word == IMAGE_MARK:
+                # Text before an image ends the page; the image then fills the next one
+                return match.start(2) if match.start() > start else match.end(2)
+            word_width = width_of(word)
+
+            new_lines = space.count("\n")
+            if new_lines:
+                # Hard line breaks end the current line and may add blank lines
+                line_width = 0
+                lines += new_lines
+            elif line_width:
+                space_width = width_of(space) if space else 0
+                if line_width + space_width + word_width <= max_width:
+                    line_width += space_width + word_width
+                    continue
+                # Wrap before this word
+                line_width = 0
+                lines += 1
+
+            if lines > max_lines:
+                return match.start(2)
+
+            if word_width <= max_width:
+                line_width = word_width
+                continue
+
+            # A word wider than the page is broken between characters, like Tk does
+            line_width = 0
+            for offset, char in enumerate(word):
+                char_width = width_of(char)
+                if line_width and line_width + char_width > max_width:
+                    lines += 1
+                    line_width = 0
+                    if lines > max_lines:
+                        return match.start(2) + offset
+                line_width += char_width
+
+        return len(text)
+
+    def paginate(self, text, first_page_lines=None):
+        """Return an array of page start offsets; the first is always 0
+
+        first_page_lines limits the first page, which also holds the chapter
+        heading.
+        """
+        layout = PageLayout(self, text, first_page_lines)
+        layout.layout_all()
+        return layout.pages
+
+
+class PageLayout:
+    """Page breaks of one text, laid out only as far as pages are requested
+
+    Showing a spread costs the layout of that spread, not of the whole
+    chapter, so the first page of a huge chapter appears as fast as that of
+    a short one. Jumping to an offset lays out the pages before it once.
+    """
+
+    def __init__(self, paginator, text, first_page_lines=None):
+        self.paginator = paginator
+        self.text = text
+        self.length = len(text)
+        self.first_page_lines = first_page_lines
+        self.pages = array('I', [0])
+        self.complete = not text
+
+    def _layout_next(self):
+        start = self.pages[-1]
+        if len(self.pages) == 1 and self.first_page_lines is not None:
+            max_lines = max(1, self.first_page_lines)
+        else:
+            max_lines = self.paginator.lines_per_page
+        end = self.paginator.page_end(self.text, start, max_lines)
+        if end >= self.length:
+            self.complete = True
+            # Cached layouts must not keep whole chapters alive once they are done
+            self.text = None
+        else:
+            self.pages.append(end)
+
+    def has_page(self, page):
+        while len(self.pages) <= page and not self.complete:
+            self._layout_next()
+        return page < len(self.pages)
+
+    def page_at(self, offset):
+        """Return the page containing a character offset"""
+        while not self.complete and self.pages[-1] <= offset:
+            self._layout_next()
+        return max(0, bisect_right(self.pages, offset) - 1)
+
+    def bounds(self, page):
+        """Return the (start, end) offsets of a page"""
+        end = self.pages[page + 1] if self.has_page(page + 1) else self.length
+        return self.pages[page], end
+
+    def layout_all(self):
+        while not self.complete:
+            self._layout_next()
+
+    def page_count(self):
+        """Number of pages laid out so far; final once complete is true"""
+        return len(self.pages)
+
+
+class PageCache:
+    """LRU cache of page layouts keyed by chapter, font and page size"""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        layout = self._entries.get(key)
+        if layout is not None:
+            self._entries.move_to_end(key)
+        return layout
+
+    def put(self, key, layout):
+        self._entries[key] = layout
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
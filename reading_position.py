@@ -0,0 +1,90 @@
+"""
+Reading positions for EPUB Reader
+
+A reading position is a chapter and a character offset in that chapter's
+text. BookPositions keeps the running total of the chapter lengths, computed
+once per book, so a position converts to a location in the whole book (and
+back, with one bisection) without touching any text. That gives exact
+progress and, with the reader's measured reading speed, the time left.
+"""
+
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+
+DEFAULT_CHARS_PER_MINUTE = 1000
+# Page turns faster or slower than this are skimming or a break, not reading
+MIN_PAGE_SECONDS = 3
+MAX_PAGE_SECONDS = 600
+# Weight of the newest page turn in the reading speed average
+SPEED_SMOOTHING = 0.1
+
+
+class BookPositions:
+    """Cumulative chapter lengths of a book
+
+    starts[i] is the location of the first character of chapter i and
+    starts[-1] the length of the whole book.
+    """
+
+    def __init__(self, lengths):
+        self.starts = array('Q', accumulate(lengths, initial=0))
+
+    @property
+    def total(self):
+        return self.starts[-1]
+
+    def __len__(self):
+        return len(self.starts) - 1
+
+    def chapter_length(self, chapter):
+        return self.starts[chapter + 1] - self.starts[chapter]
+
+    def to_location(self, chapter, offset):
+        """Return the location in the whole book of an offset in a chapter"""
+        return self.starts[chapter] + max(0, min(offset, self.chapter_length(chapter)))
+
+    def from_location(self, location):
+        """Return the (chapter, offset) of a location in the whole book"""
+        location = max(0, min(location, self.total))
+        # Empty chapters share their start with the next one; land on the one that has text
+        chapter = min(bisect_right(self.starts, location) - 1, len(self) - 1)
+        return chapter, location - self.starts[chapter]
+
+    def fraction(self, chapter, offset):
+        """Return how far into the book a position is, from 0.0 to 1.0"""
+        return self.to_location(chapter, offset) / self.total if self.total else 0.0
+
+    def remaining(self, chapter, offset):
+        """Return the characters left after a position in its chapter and in the book"""
+        location = self.to_location(chapter, offset)
+        return self.starts[chapter + 1] - location, self.total - location
+
+
+class ReadingSpeed:
+    """Characters read per minute, averaged over page turns"""
+
+    def __init__(self, chars_per_minute=DEFAULT_CHARS_PER_MINUTE):
+        self.chars_per_minute = chars_per_minute
+
+    def page_turned(self, chars, seconds):
+        """Account for a page of chars that was on screen for seconds; returns True if it counted"""
+        if not chars or not MIN_PAGE_SECONDS <= seconds <= MAX_PAGE_SECONDS:
+            return False
+        rate = chars * 60 / seconds
+        self.chars_per_minute += SPEED_SMOOTHING * (rate - self.chars_per_minute)
+        return True
+
+    def minutes(self, chars):
+        return chars / self.chars_per_minute if self.chars_per_minute > 0 else 0.0
+
+
+def format_minutes(minutes):
+    """Format a reading time such as "< 1 min", "25 min" or "3 h 10 min\""""
+    minutes = round(minutes)
+    if minutes < 1:
+        return "< 1 min"
+    hours, minutes = divmod(minutes, 60)
+    if not hours:
+        return f"{minutes} min"
+    return f"{hours} h {minutes} min" if minutes else f"{hours} h"
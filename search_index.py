@@ -0,0 +1,230 @@
+"""
+Full-text search over one book using an inverted index
+
+Every token maps to two parallel arrays: its global token positions (used
+for phrase adjacency and to find the chapter) and its character offsets
+within the chapter (used for snippets and highlighting). CJK ideographs and
+kana are indexed one character per token, so phrase queries work for text
+without spaces.
+"""
+
+import os
+import re
+import math
+import pickle
+from array import array
+from bisect import bisect_left, bisect_right
+
+INDEX_VERSION = 2
+
+CJK_RANGES = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+TOKEN_RE = re.compile(f"[{CJK_RANGES}]|(?:(?![{CJK_RANGES}])\\w)+")
+
+# BM25 parameters used to rank chapters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    """Return the lower-cased tokens of a query string"""
+    return [match.group().lower() for match in TOKEN_RE.finditer(text)]
+
+
+def parse_query(query):
+    """Split a query into phrases: quoted text is one phrase, other words are single-term phrases"""
+    phrases = []
+    for quoted, bare in re.findall(r'"([^"]*)"|(\S+)', query):
+        if quoted:
+            tokens = tokenize(quoted)
+            if tokens:
+                phrases.append(tokens)
+        else:
+            # CJK runs typed without quotes are still meant as one phrase
+            tokens = tokenize(bare)
+            if len(tokens) > 1 and all(re.match(f"[{CJK_RANGES}]", token) for token in tokens):
+                phrases.append(tokens)
+            else:
+                phrases.extend([token] for token in tokens)
+    return phrases
+
+
+def make_snippet(text, offset, length, width=40):
+    """Return the match with some surrounding context on one line"""
+    start = max(0, offset - width)
+    end = min(len(text), offset + length + width)
+    snippet = text[start:end].replace("\n", " ")
+    return ("…" if start > 0 else "") + snippet + ("…" if end < len(text) else "")
+
+
+class SearchIndex:
+    """Inverted index from token to chapter and character offsets"""
+
+    def __init__(self):
+        self.postings = {}
+        self.chapter_starts = array('I')
+        self.total_tokens = 0
+
+    @classmethod
+    def build(cls, texts, cancelled=None):
+        """Index a sequence of chapter texts; returns None if cancelled() turns true"""
+        index = cls()
+        postings = index.postings
+        position = 0
+        for text in texts:
+            if cancelled is not None and cancelled():
+                return None
+            index.chapter_starts.append(position)
+            for match in TOKEN_RE.finditer(text):
+                token = match.group().lower()
+                entry = postings.get(token)
+                if entry is None:
+                    entry = postings[token] = (array('I'), array('I'))
+                entry[0].append(position)
+                entry[1].append(match.start())
+                position += 1
+        index.total_tokens = position
+        return index
+
+    def chapter_of(self, position):
+        return bisect_right(self.chapter_starts, position) - 1
+
+    def chapter_token_count(self, chapter):
+        end = (self.chapter_starts[chapter + 1] if chapter + 1 < len(self.chapter_starts)
+               else self.total_tokens)
+        return end - self.chapter_starts[chapter]
+
+    def _phrase_matches(self, tokens):
+        """Return sorted global positions where the phrase starts"""
+        entries = [self.postings.get(token) for token in tokens]
+        if not all(entries):
+            return []
+        if len(tokens) == 1:
+            return entries[0][0]
+
+        # Walk the rarest term and binary-search the others at their expected position
+        rarest = min(range(len(tokens)), key=lambda i: len(entries[i][0]))
+        starts = []
+        for position in entries[rarest][0]:
+            start = position - rarest
+            for i, entry in enumerate(entries):
+                if i == rarest:
+                    continue
+                positions = entry[0]
+                target = start + i
+                found = bisect_left(positions, target)
+                if found == len(positions) or positions[found] != target:
+                    break
+            else:
+                starts.append(start)
+        return starts
+
+    def _chapters_with(self, positions):
+        """Return the chapters containing any of the sorted positions, skipping ahead per chapter"""
+        chapters = []
+        i = 0
+        while i < len(positions):
+            chapter = self.chapter_of(positions[i])
+            chapters.append(chapter)
+            if chapter + 1 >= len(self.chapter_starts):
+                break
+            i = bisect_left(positions, self.chapter_starts[chapter + 1], i)
+        return chapters
+
+    def _offset_at(self, token, position):
+        positions, offsets = self.postings[token]
+        return offsets[bisect_left(positions, position)]
+
+    def search(self, query, limit=200, hits_per_chapter=20):
+        """Return ranked hits as dicts with chapter, offset, length and score
+
+        All phrases must occur in a chapter for it to match. Chapters are
+        ranked with BM25 and each contributes up to hits_per_chapter hits of
+        its rarest phrase, in reading order.
+        """
+        phrases = parse_query(query)
+        if not phrases or not self.chapter_starts:
+            return []
+
+        matches = [self._phrase_matches(tokens) for tokens in phrases]
+        if not all(matches):
+            return []
+
+        chapter_count = len(self.chapter_starts)
+        average_length = self.total_tokens / chapter_count or 1
+        rarest = min(range(len(phrases)), key=lambda i: len(matches[i]))
+
+        # Candidate chapters are those of the rarest phrase
+        candidates = self._chapters_with(matches[rarest])
+        idfs = []
+        for phrase_matches in matches:
+            df = len(self._chapters_with(phrase_matches))
+            idfs.append(math.log(1 + (chapter_count - df + 0.5) / (df + 0.5)))
+
+        scored = []
+        for chapter in candidates:
+            start = self.chapter_starts[chapter]
+            end = start + self.chapter_token_count(chapter)
+            score = 0.0
+            for phrase_matches, idf in zip(matches, idfs):
+                tf = bisect_left(phrase_matches, end) - bisect_left(phrase_matches, start)
+                if not tf:
+                    break
+                length_norm = K1 * (1 - B + B * (end - start) / average_length)
+                score += idf * tf * (K1 + 1) / (tf + length_norm)
+            else:
+                scored.append((score, chapter, start, end))
+
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        hits = []
+        phrase = phrases[rarest]
+        phrase_matches = matches[rarest]
+        for score, chapter, start, end in scored:
+            first = bisect_left(phrase_matches, start)
+            last = min(bisect_left(phrase_matches, end), first + hits_per_chapter)
+            for position in phrase_matches[first:last]:
+                offset = self._offset_at(phrase[0], position)
+                end_offset = self._offset_at(phrase[-1], position + len(phrase) - 1) + len(phrase[-1])
+                hits.append({'chapter': chapter, 'offset': offset,
+                             'length': end_offset - offset, 'score': score})
+                if len(hits) >= limit:
+                    return hits
+        return hits
+
+    def save(self, path, fingerprint, source=None):
+        """Persist the index, tagged with the book's (size, mtime) fingerprint
+
+        source describes how the indexed text was produced (such as the book
+        cache version and extraction backend); offsets are only valid for
+        text produced the same way.
+        """
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({
+                "version": INDEX_VERSION,
+                "fingerprint": list(fingerprint),
+                "source": source,
+                "chapter_starts": self.chapter_starts,
+                "total_tokens": self.total_tokens,
+                "postings": self.postings
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, fingerprint, source=None):
+        """Load a persisted index, or return None if missing, stale, built from other text or corrupt"""
+        try:
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
+            if (data.get("version") != INDEX_VERSION or data.get("fingerprint") != list(fingerprint) or
+                    data.get("source") != source):
+                return None
+            index = cls()
+            index.chapter_starts = data["chapter_starts"]
+            index.total_tokens = data["total_tokens"]
+            index.postings = data["postings"]
+            return index
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"❌ Corrupt search index {path}: {e}")
+            return None
@@ -0,0 +1,85 @@
+"""
+Write-behind persistence for EPUB Reader settings
+
+Saving only takes a snapshot of the settings; a background thread writes it
+once changes have stopped arriving for a short delay, so paging through a
+book or stepping the font size never waits on the disk. Files are written
+to a temporary name, synced and renamed over the old one, so a crash never
+leaves a truncated settings file behind.
+"""
+
+import os
+import json
+import time
+import threading
+
+
+class SettingsStore:
+    """Debounced, atomic JSON writer running on a background thread"""
+
+    def __init__(self, path, delay=0.5, on_error=None):
+        self.path = path
+        self.delay = delay
+        self.on_error = on_error
+        self._cond = threading.Condition()
+        self._pending = None
+        self._due = 0.0
+        self._writing = False
+        self._thread = None
+
+    def save(self, settings):
+        """Schedule settings to be written; later saves within the delay replace it"""
+        # Serializing here is the snapshot: later changes to the dict are not written by accident
+        data = json.dumps(settings, indent=2, ensure_ascii=False)
+        with self._cond:
+            self._pending = data
+            self._due = time.monotonic() + self.delay
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="settings-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def flush(self, timeout=5.0):
+        """Write pending settings now and wait until they are on disk"""
+        with self._cond:
+            self._due = 0.0
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._pending is None and not self._writing, timeout)
+
+    def discard(self):
+        """Drop pending settings, e.g. before the settings file is deleted"""
+        with self._cond:
+            self._pending = None
+            self._cond.wait_for(lambda: not self._writing, 5.0)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                remaining = self._due - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                data, self._pending = self._pending, None
+                self._writing = True
+            try:
+                self._write(data)
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+
+    def _write(self, data):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            print(f"💾 Settings saved to {self.path}")
+        except Exception as e:
+            print(f"❌ Error saving settings: {e}")
+            if self.on_error is not None:
+                self.on_error(e)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Startup regression check for EPUB Reader
+
+Measures, in fresh interpreters:
+  * the time to `import epub_reader` (python -X importtime), against a budget
+  * which heavy modules are loaded by then; they must wait for first use
+  * the time from launching Python to the first drawn frame of the window
+
+Exits non-zero when the import budget is exceeded, a heavy module is loaded
+at startup, or a timing regressed against a baseline saved with -o.
+
+Examples:
+    python startup_check.py -o startup_baseline.json
+    python startup_check.py --baseline startup_baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+RESULTS_VERSION = 1
+
+# Cumulative import time of epub_reader allowed on a typical machine
+IMPORT_BUDGET_MS = 150
+
+# Modules that must only be imported when a book is opened or a feature is used
+HEAVY_MODULES = ("bs4", "lxml", "PIL", "sqlite3", "epub_engine", "library_index")
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_PROBE = f"""
+import sys, json
+sys.path.insert(0, {REPO_DIR!r})
+import epub_reader
+print(json.dumps(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules)))
+"""
+
+# Builds the real window; the time is taken once Tk reports it visible and drawn
+FIRST_FRAME_PROBE = f"""
+import sys, json, time
+sys.path.insert(0, {REPO_DIR!r})
+import tkinter as tk
+import epub_reader
+try:
+    root = tk.Tk()
+except tk.TclError as e:
+    # Only this is a missing display; any other failure is a startup failure
+    print(json.dumps({{"no_display": str(e)}}))
+    sys.exit(0)
+app = epub_reader.EpubReader(root)
+root.wait_visibility(root)
+root.update_idletasks()
+drawn = time.time()
+heavy = sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules)
+root.destroy()
+print(json.dumps({{"drawn": drawn, "heavy": heavy}}))
+"""
+
+
+def measure_import(repeat):
+    """Return the best cumulative import time of epub_reader in ms and the heavy modules it loaded"""
+    timings = []
+    heavy = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", IMPORT_PROBE],
+                                capture_output=True, text=True, check=True)
+        for line in result.stderr.splitlines():
+            fields = line.split("|")
+            if len(fields) == 3 and fields[2].strip() == "epub_reader":
+                timings.append(int(fields[1]) / 1000)
+        heavy = json.loads(result.stdout.strip().splitlines()[-1])
+    return min(timings), heavy
+
+
+def measure_first_frame(repeat):
+    """Return the median launch-to-first-frame time in ms, or None without a display
+
+    Returns (ms, heavy modules, error); error describes a probe that failed
+    for any reason other than a missing display.
+    """
+    timings = []
+    heavy = []
+    # A scratch working directory means no saved settings and no book auto-load
+    with tempfile.TemporaryDirectory() as work_dir:
+        for _ in range(repeat):
+            start = time.time()
+            result = subprocess.run([sys.executable, "-c", FIRST_FRAME_PROBE], cwd=work_dir,
+                                    capture_output=True, text=True)
+            if result.returncode != 0:
+                return None, [], "\n".join(result.stderr.strip().splitlines()[-5:])
+            probe = json.loads(result.stdout.strip().splitlines()[-1])
+            if "no_display" in probe:
+                print(f"⚠️ No display, skipping the first-frame check: {probe['no_display']}", file=sys.stderr)
+                return None, [], None
+            timings.append((probe["drawn"] - start) * 1000)
+            heavy = probe["heavy"]
+    return statistics.median(timings), heavy, None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check EPUB Reader startup time against a budget and baseline.")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement")
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="slowdown ratio against the baseline reported as a regression")
+    parser.add_argument("-o", "--output", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    import_ms, import_heavy = measure_import(args.repeat)
+    first_frame_ms, frame_heavy, frame_error = measure_first_frame(args.repeat)
+    results = {
+        "version": RESULTS_VERSION,
+        "python": sys.version.split()[0],
+        "import_ms": import_ms,
+        "first_frame_ms": first_frame_ms,
+        "heavy_modules_at_import": import_heavy,
+        "heavy_modules_at_first_frame": frame_heavy
+    }
+
+    failures = 0
+    flag = "❌" if import_ms > args.import_budget_ms else "✅"
+    failures += import_ms > args.import_budget_ms
+    print(f"{flag} import epub_reader: {import_ms:.1f} ms (budget {args.import_budget_ms:.0f} ms)")
+    for stage, heavy in (("import", import_heavy), ("first frame", frame_heavy)):
+        if heavy:
+            failures += 1
+            print(f"❌ heavy modules loaded by {stage}: {', '.join(heavy)}")
+    if frame_error is not None:
+        failures += 1
+        print(f"❌ first-frame probe failed:\n{frame_error}")
+    elif first_frame_ms is not None:
+        print(f"⏱️ launch to first frame: {first_frame_ms:.0f} ms")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        for key in ("import_ms", "first_frame_ms"):
+            before, after = baseline.get(key), results[key]
+            if not before or after is None:
+                continue
+            ratio = after / before
+            flag = "❌" if ratio > args.threshold else "✅"
+            failures += ratio > args.threshold
+            print(f"{flag} {key}: {before:.1f} -> {after:.1f} ({ratio:.2f}x)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Synthetic EPUB generator for benchmarks
+
+Writes valid EPUB 3 files of a controlled size. The same arguments and seed
+always produce byte-identical files, so benchmark results can be compared
+between commits.
+
+Example:
+    python synthetic_epub.py big.epub --chapters 500 --chapter-chars 40000 --script cjk --images 20
+"""
+
+import zlib
+import struct
+import random
+import zipfile
+import argparse
+
+# Fixed timestamp so the zip bytes do not depend on when the file was made
+ZIP_DATE = (2020, 1, 1, 0, 0, 0)
+
+LATIN_WORDS = ("the of and to in a is that for it as was with be by on not he this are or his from at which "
+               "but have an they you were her she there been one all we their has would when if so no what "
+               "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut "
+               "labore et dolore magna aliqua enim minim veniam quis nostrud exercitation ullamco").split()
+
+CONTAINER_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>
+"""
+
+
+def latin_paragraph(rng, chars):
+    """Return roughly chars characters of Latin-script words"""
+    words = []
+    length = 0
+    while length < chars:
+        word = rng.choice(LATIN_WORDS)
+        words.append(word)
+        length += len(word) + 1
+    words[0] = words[0].capitalize()
+    return " ".join(words) + "."
+
+
+def cjk_paragraph(rng, chars):
+    """Return chars CJK ideographs with occasional punctuation"""
+    text = []
+    for i in range(chars):
+        text.append(chr(rng.randint(0x4E00, 0x9FA5)))
+        if i % 17 == 16:
+            text.append("，")
+    text.append("。")
+    return "".join(text)
+
+
+def make_png(rng, width, height):
+    """Return a noisy RGB PNG, which barely compresses like a real photo"""
+    def chunk(kind, data):
+        return (struct.pack(">I", len(data)) + kind + data +
+                struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff))
+
+    row_bytes = width * 3
+    rows = b"".join(b"\x00" + rng.getrandbits(row_bytes * 8).to_bytes(row_bytes, 'little')
+                    for _ in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) +
+            chunk(b"IDAT", zlib.compress(rows, 6)) + chunk(b"IEND", b""))
+
+
+def chapter_html(rng, index, chapter_chars, script, image_href=None):
+    """Return one XHTML chapter document"""
+    make_paragraph = cjk_paragraph if script == "cjk" else latin_paragraph
+    paragraph_chars = 150 if script == "cjk" else 600
+    lang = "zh" if script == "cjk" else "en"
+
+    body = [f'<h1 id="chapter-{index}">Chapter {index + 1}</h1>']
+    if image_href:
+        body.append(f'<p><img src="{image_href}" alt="Illustration {index + 1}"/></p>')
+    written = 0
+    paragraph = 0
+    while written < chapter_chars:
+        text = make_paragraph(rng, min(paragraph_chars, chapter_chars - written))
+        body.append(f'<p id="p{index}-{paragraph}">{text}</p>')
+        written += len(text)
+        paragraph += 1
+
+    return f"""<?xml version="1.0" encoding="utf-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" lang="{lang}">
+<head><title>Chapter {index + 1}</title><style>p {{ text-indent: 1em; }}</style>
+<script>var chapter = {index};</script></head>
+<body>
+{chr(10).join(body)}
+</body>
+</html>
+"""
+
+
+def make_epub(path, chapters=20, chapter_chars=20000, script="latin", images=0,
+              image_size=(800, 600), seed=0):
+    """Write a synthetic EPUB to path and return the path"""
+    rng = random.Random(seed)
+    image_every = max(1, chapters // images) if images else 0
+
+    manifest = []
+    spine = []
+    nav_items = []
+    documents = []
+    image_files = []
+    for index in range(chapters):
+        image_href = None
+        if images and index % image_every == 0 and len(image_files) < images:
+            image_href = f"images/img{len(image_files):04d}.png"
+            image_files.append((image_href, make_png(rng, *image_size)))
+            manifest.append(f'<item id="img{len(image_files)}" href="{image_href}" media-type="image/png"/>')
+
+        href = f"text/chapter{index:05d}.xhtml"
+        documents.append((href, chapter_html(rng, index, chapter_chars, script,
+                                             f"../{image_href}" if image_href else None)))
+        manifest.append(f'<item id="c{index}" href="{href}" media-type="application/xhtml+xml"/>')
+        spine.append(f'<itemref idref="c{index}"/>')
+        nav_items.append(f'<li><a href="{href}#chapter-{index}">Chapter {index + 1}</a></li>')
+
+    opf = f"""<?xml version="1.0" encoding="utf-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="uid">
+  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/">
+    <dc:identifier id="uid">synthetic-{script}-{chapters}-{chapter_chars}-{images}-{seed}</dc:identifier>
+    <dc:title>Synthetic {script} book ({chapters} chapters)</dc:title>
+    <dc:creator>Benchmark Generator</dc:creator>
+    <dc:language>{"zh" if script == "cjk" else "en"}</dc:language>
+  </metadata>
+  <manifest>
+    <item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>
+    {chr(10).join("    " + item for item in manifest).strip()}
+  </manifest>
+  <spine>
+    {chr(10).join("    " + item for item in spine).strip()}
+  </spine>
+</package>
+"""
+
+    nav = f"""<?xml version="1.0" encoding="utf-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops">
+<head><title>Contents</title></head>
+<body><nav epub:type="toc"><ol>
+{chr(10).join(nav_items)}
+</ol></nav></body>
+</html>
+"""
+
+    def write(archive, name, data, compress=zipfile.ZIP_DEFLATED):
+        info = zipfile.ZipInfo(name, date_time=ZIP_DATE)
+        info.compress_type = compress
+        archive.writestr(info, data)
+
+    with zipfile.ZipFile(path, 'w') as archive:
+        write(archive, "mimetype", "application/epub+zip", zipfile.ZIP_STORED)
+        write(archive, "META-INF/container.xml", CONTAINER_XML)
+        write(archive, "OEBPS/content.opf", opf)
+        write(archive, "OEBPS/nav.xhtml", nav)
+        for href, html in documents:
+            write(archive, f"OEBPS/{href}", html.encode('utf-8'))
+        for href, data in image_files:
+            write(archive, f"OEBPS/{href}", data, zipfile.ZIP_STORED)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic EPUB for benchmarking.")
+    parser.add_argument("path", help="output .epub file")
+    parser.add_argument("--chapters", type=int, default=20)
+    parser.add_argument("--chapter-chars", type=int, default=20000, help="approximate characters per chapter")
+    parser.add_argument("--script", choices=("latin", "cjk"), default="latin")
+    parser.add_argument("--images", type=int, default=0, help="number of embedded PNG images")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    make_epub(args.path, args.chapters, args.chapter_chars, args.script, args.images, seed=args.seed)
+    print(f"📚 Wrote {args.path}")
+
+
+if __name__ == "__main__":
+    main()
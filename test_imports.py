@@ -14,9 +14,11 @@ def test_imports():
         from tkinter import ttk, filedialog, messagebox, scrolledtext
         print("✅ tkinter widgets imported successfully")
         
-        import ebooklib
-        from ebooklib import epub
-        print("✅ ebooklib imported successfully")
+        import zipfile
+        print("✅ zipfile imported successfully")
+        
+        from lxml import etree, html
+        print("✅ lxml imported successfully")
         
         from bs4 import BeautifulSoup
         print("✅ BeautifulSoup imported successfully")
@@ -0,0 +1,129 @@
+"""
+Lightweight phase timing for EPUB Reader
+
+Code wraps interesting phases in `tracer.span("name")`. When the tracer is
+disabled a span is a shared no-op object, so instrumented code costs one
+attribute check per call. Recorded spans can be summarized for the
+diagnostics dialog or exported as a Chrome trace (chrome://tracing or
+https://ui.perfetto.dev).
+"""
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from functools import wraps
+
+
+class _NullSpan:
+    """Span used while timing is disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.args = dict(self.args or {}, error=exc_type.__name__)
+        self.tracer.record(self.name, self.start, end, self.args)
+        return False
+
+
+class Tracer:
+    """Collects timed spans in a bounded ring buffer"""
+
+    def __init__(self, enabled=True, max_events=20000):
+        self.enabled = enabled
+        self.events = deque(maxlen=max_events)
+        self.origin = time.perf_counter()
+        self._thread_names = {}
+
+    def span(self, name, **args):
+        """Context manager timing the enclosed block"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def timed(self, name=None):
+        """Decorator timing every call of a function"""
+        def decorator(func):
+            span_name = name or func.__name__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Span(self, span_name, None):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record(self, name, start, end, args=None):
+        thread = threading.current_thread()
+        self._thread_names[thread.ident] = thread.name
+        # deque.append is atomic, so worker threads can record without a lock
+        self.events.append((name, start, end, thread.ident, args))
+
+    def clear(self):
+        self.events.clear()
+
+    def summary(self):
+        """Return per-phase statistics in milliseconds, slowest total first"""
+        phases = {}
+        for name, start, end, _, _ in list(self.events):
+            duration = (end - start) * 1000
+            stats = phases.setdefault(name, {"name": name, "count": 0, "total_ms": 0.0,
+                                             "max_ms": 0.0, "last_ms": 0.0})
+            stats["count"] += 1
+            stats["total_ms"] += duration
+            stats["max_ms"] = max(stats["max_ms"], duration)
+            stats["last_ms"] = duration
+        for stats in phases.values():
+            stats["mean_ms"] = stats["total_ms"] / stats["count"]
+        return sorted(phases.values(), key=lambda stats: stats["total_ms"], reverse=True)
+
+    def to_chrome_trace(self):
+        """Return the recorded spans in Chrome trace event format"""
+        pid = os.getpid()
+        trace_events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                         "args": {"name": thread_name}}
+                        for tid, thread_name in list(self._thread_names.items())]
+        for name, start, end, tid, args in list(self.events):
+            event = {
+                "name": name,
+                "ph": "X",
+                "ts": (start - self.origin) * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": pid,
+                "tid": tid
+            }
+            if args:
+                event["args"] = args
+            trace_events.append(event)
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(), f, ensure_ascii=False)
+
+
+# Shared tracer used by the reader and the extraction engine
+tracer = Tracer()
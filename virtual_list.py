@@ -0,0 +1,268 @@
+"""
+Virtualized list widget for EPUB Reader
+
+Dictionaries and periodical archives can have tens of thousands of spine
+documents. A Listbox holding every title is slow to fill and to search, so
+VirtualList keeps the titles in a Python list and puts only the rows that
+fit on screen into its Listbox. It refills those rows as the list scrolls.
+Typing in the filter box narrows the list to titles containing the text.
+"""
+
+import tkinter as tk
+from tkinter import ttk
+import tkinter.font as tkfont
+
+# Pause after the last keystroke before the filter is applied
+FILTER_DELAY_MS = 120
+
+
+class VirtualList(ttk.Frame):
+    """Scrollable, filterable list of titles that only materializes the visible rows
+
+    on_select(index) is called with the position of the chosen item in the
+    full list. With activate="single" a click chooses an item (like the
+    chapter sidebar); with "double" it takes a double-click. Return works in
+    both modes. on_highlight(index), if given, is called whenever the
+    highlighted item changes, by a click or with the keyboard.
+    """
+
+    def __init__(self, parent, on_select=None, font=("Arial", 10), numbered=False, activate="single",
+                 on_highlight=None):
+        super().__init__(parent)
+        self.on_select = on_select
+        self.on_highlight = on_highlight
+        self.numbered = numbered
+        self.items = []
+        self._folded = []
+        # Positions in items that match the filter, or None when not filtering
+        self.view = None
+        self.query = ""
+        self.top = 0
+        self.rows = 1
+        self.selected = None
+        self._filter_job = None
+
+        filter_frame = ttk.Frame(self)
+        filter_frame.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(filter_frame, text="🔎").pack(side=tk.LEFT)
+        self.filter_var = tk.StringVar()
+        self.filter_entry = ttk.Entry(filter_frame, textvariable=self.filter_var)
+        self.filter_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0))
+        self.filter_var.trace_add("write", self._schedule_filter)
+        self.filter_entry.bind('<Return>', self._activate_first)
+        self.filter_entry.bind('<Down>', lambda event: self.listbox.focus_set())
+
+        self.listbox = tk.Listbox(self, font=font, height=1, activestyle='none', exportselection=False)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        line = tkfont.Font(font=self.listbox.cget('font')).metrics('linespace')
+        self.row_height = line + 1 + 2 * int(self.listbox.cget('selectborderwidth'))
+
+        self.listbox.bind('<Configure>', self._on_resize)
+        if activate == "double":
+            self.listbox.bind('<Double-Button-1>', self._on_click)
+            self.listbox.bind('<<ListboxSelect>>', self._on_listbox_select)
+        else:
+            self.listbox.bind('<<ListboxSelect>>', self._on_click)
+        self.listbox.bind('<Return>', lambda event: self._choose(self.selected))
+        self.listbox.bind('<Up>', lambda event: self._move(-1))
+        self.listbox.bind('<Down>', lambda event: self._move(1))
+        self.listbox.bind('<Prior>', lambda event: self._move(-self.rows))
+        self.listbox.bind('<Next>', lambda event: self._move(self.rows))
+        self.listbox.bind('<Home>', lambda event: self._move(-len(self.items)))
+        self.listbox.bind('<End>', lambda event: self._move(len(self.items)))
+        self.listbox.bind('<MouseWheel>', lambda event: self._scroll(-3 if event.delta > 0 else 3))
+        self.listbox.bind('<Button-4>', lambda event: self._scroll(-3))
+        self.listbox.bind('<Button-5>', lambda event: self._scroll(3))
+
+    # Contents
+
+    def set_items(self, titles):
+        """Replace every item, keeping the current filter text"""
+        self.items = list(titles)
+        self._folded = [title.casefold() for title in self.items]
+        self.selected = None
+        self.top = 0
+        self.view = self._matches(self.query, range(len(self.items))) if self.query else None
+        self._render()
+
+    def append(self, titles):
+        """Add items at the end, e.g. as a book's chapters arrive"""
+        start = len(self.items)
+        self.items.extend(titles)
+        self._folded.extend(title.casefold() for title in titles)
+        if self.view is not None:
+            self.view.extend(self._matches(self.query, range(start, len(self.items))))
+        if self.selected is not None and start <= self.selected < len(self.items):
+            self.see(self.selected)
+        else:
+            self._render()
+
+    def clear(self):
+        self.set_items([])
+
+    def size(self):
+        return len(self.items)
+
+    def select(self, index):
+        """Highlight an item (None for no item) and scroll it into view
+
+        The index may be past the end while items are still being appended;
+        the item is highlighted once it arrives.
+        """
+        self.selected = index
+        if index is not None and index < len(self.items):
+            self.see(index)
+        else:
+            self._render()
+
+    def see(self, index):
+        """Scroll so that an item is visible, if it passes the filter"""
+        position = self._position(index)
+        if position is not None and not self.top <= position < self.top + self.rows:
+            self.top = position - self.rows // 2
+        self._render()
+
+    def configure_rows(self, **options):
+        """Configure the row colors and font of the underlying Listbox"""
+        self.listbox.configure(**options)
+
+    # Filtering
+
+    def _matches(self, query, positions):
+        folded = self._folded
+        return [i for i in positions if query in folded[i]]
+
+    def _schedule_filter(self, *args):
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(FILTER_DELAY_MS, self.apply_filter)
+
+    def apply_filter(self):
+        """Narrow the list to titles containing the filter text"""
+        self._filter_job = None
+        query = self.filter_var.get().strip().casefold()
+        if query == self.query:
+            return
+        if not query:
+            self.view = None
+        elif self.view is not None and query.startswith(self.query):
+            # Typing more only narrows the list, so only the current matches need checking
+            self.view = self._matches(query, self.view)
+        else:
+            self.view = self._matches(query, range(len(self.items)))
+        self.query = query
+        self.top = 0
+        if self.selected is not None:
+            self.see(self.selected)
+        else:
+            self._render()
+
+    def _activate_first(self, event):
+        self.apply_filter()
+        if self._view_length():
+            self._choose(self._item_at(0))
+
+    # Rendering and scrolling
+
+    def _view_length(self):
+        return len(self.items) if self.view is None else len(self.view)
+
+    def _item_at(self, position):
+        return position if self.view is None else self.view[position]
+
+    def _position(self, index):
+        """Return where an item is in the filtered view, or None if filtered out"""
+        if index is None or index >= len(self.items):
+            return None
+        if self.view is None:
+            return index
+        # The view is in list order, so it can be searched by bisection
+        lo, hi = 0, len(self.view)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.view[mid] < index:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < len(self.view) and self.view[lo] == index else None
+
+    def _render(self):
+        """Put the rows from top into the Listbox and update the scrollbar"""
+        length = self._view_length()
+        self.top = max(0, min(self.top, length - self.rows))
+        end = min(length, self.top + self.rows + 1)
+
+        rows = []
+        for position in range(self.top, end):
+            index = self._item_at(position)
+            rows.append(f"{index + 1}. {self.items[index]}" if self.numbered else self.items[index])
+        self.listbox.delete(0, tk.END)
+        if rows:
+            self.listbox.insert(0, *rows)
+        self.listbox.yview_moveto(0)
+
+        position = self._position(self.selected)
+        if position is not None and self.top <= position < end:
+            self.listbox.selection_set(position - self.top)
+
+        if length:
+            self.scrollbar.set(self.top / length, min(1.0, (self.top + self.rows) / length))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _on_resize(self, event):
+        rows = max(1, event.height // self.row_height)
+        if rows != self.rows:
+            self.rows = rows
+            self._render()
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.top = int(float(amount) * self._view_length())
+            self._render()
+        else:
+            self._scroll(int(amount) * (self.rows if unit == "pages" else 1))
+
+    def _scroll(self, rows):
+        self.top += rows
+        self._render()
+        return "break"
+
+    def _move(self, step):
+        """Move the highlight with the keyboard without choosing the item"""
+        length = self._view_length()
+        if not length:
+            return "break"
+        position = self._position(self.selected)
+        if position is None:
+            position = self.top if step > 0 else min(length, self.top + self.rows) - 1
+        else:
+            position = max(0, min(length - 1, position + step))
+        self.selected = self._item_at(position)
+        self.see(self.selected)
+        if self.on_highlight is not None:
+            self.on_highlight(self.selected)
+        return "break"
+
+    def _on_listbox_select(self, event):
+        selection = self.listbox.curselection()
+        if selection and self.top + selection[0] < self._view_length():
+            self.selected = self._item_at(self.top + selection[0])
+            if self.on_highlight is not None:
+                self.on_highlight(self.selected)
+
+    def _on_click(self, event):
+        selection = self.listbox.curselection()
+        if selection and self.top + selection[0] < self._view_length():
+            self._choose(self._item_at(self.top + selection[0]))
+
+    def _choose(self, index):
+        if index is None:
+            return "break"
+        self.selected = index
+        if self.on_select is not None:
+            self.on_select(index)
+        return "break"